@@ -1,435 +1,77 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
-import cv2
 import numpy as np
 import base64
-import torch
 import json
+import csv
+import io
 import os
 from datetime import datetime
 import logging
-import sys
+import time
+
+import autotune
+import logging_setup
+import timeseries_store
+import session_analytics
+import presence
+import response_encoding
+import worker_pool
+import stream_scheduler
+import frame_decode
+import seat_cadence
+from detector import YOLODetector, resolve_model_path
 
 app = Flask(__name__)
 CORS(app)
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('flask_server.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+# Configure logging; file and console writes happen on a background listener thread
+logging_setup.configure_logging('flask_server.log')
 logger = logging.getLogger(__name__)
+hot_path_summary = logging_setup.HotPathSummary(logger)
 
 # Global variables for model
 current_model = None
 model_config = {}
+inference_pool = None
+decode_planner = frame_decode.DecodePlanner()
 
-class YOLODetector:
-    def __init__(self, model_path, confidence_threshold=0.5, iou_threshold=0.4, model_type=None):
-        self.model_path = model_path
-        self.confidence_threshold = confidence_threshold
-        self.iou_threshold = iou_threshold
-        self.model = None
-        self.model_type = model_type or 'unknown'
-        self.load_model()
-    
-    def load_model(self):
-        try:
-            logger.info(f"Loading model from {self.model_path}")
-            
-            # Check if model file exists
-            if not os.path.exists(self.model_path):
-                raise FileNotFoundError(f"Model file not found: {self.model_path}")
-            
-            # Get file size for logging
-            file_size = os.path.getsize(self.model_path) / (1024 * 1024)  # MB
-            logger.info(f"Model file size: {file_size:.2f} MB")
-            
-            # If model_type is already specified, use that directly
-            if self.model_type in ['pytorch', 'onnx', 'tensorflow', 'custom']:
-                logger.info(f"Using specified model type: {self.model_type}")
-                if self.model_type == 'pytorch':
-                    self._load_pytorch_model()
-                elif self.model_type == 'onnx':
-                    self._load_onnx_model()
-                elif self.model_type == 'tensorflow':
-                    self._load_tensorflow_model()
-                elif self.model_type == 'custom':
-                    self._load_custom_model()
-            else:
-                # Try to load the model based on file extension
-                if self.model_path.endswith('.py'):
-                    self.model_type = 'python_model'
-                    self._load_custom_model()
-                elif self.model_path.endswith('.pt') or self.model_path.endswith('.pth'):
-                    self.model_type = 'pytorch'
-                    self._load_pytorch_model()
-                elif self.model_path.endswith('.onnx'):
-                    self.model_type = 'onnx'
-                    self._load_onnx_model()
-                elif self.model_path.endswith('.pb') or self.model_path.endswith('.h5') or self.model_path.endswith('.keras'):
-                    self.model_type = 'tensorflow'
-                    self._load_tensorflow_model()
-                else:
-                    logger.warning(f"Unknown model format: {self.model_path}, attempting to load as custom model")
-                    self._load_custom_model()
-                
-        except Exception as e:
-            logger.error(f"Error loading model: {str(e)}")
-            self._use_mock_model()
-    
-    def _load_pytorch_model(self):
-        """Load PyTorch model (.pt file)"""
-        try:
-            # Try loading with ultralytics YOLOv8 first
-            try:
-                from ultralytics import YOLO
-                self.model = YOLO(self.model_path)
-                logger.info("Model loaded successfully with ultralytics YOLO")
-                return
-            except ImportError:
-                logger.info("Ultralytics not available, trying torch.hub")
-            except Exception as e:
-                logger.warning(f"Ultralytics loading failed: {e}")
-            
-            # Try loading with torch.hub (YOLOv5)
-            try:
-                self.model = torch.hub.load('ultralytics/yolov5', 'custom', path=self.model_path, force_reload=True)
-                logger.info("Model loaded successfully with torch.hub YOLOv5")
-                return
-            except Exception as e:
-                logger.warning(f"Torch.hub loading failed: {e}")
-            
-            # Try loading as raw PyTorch model
-            try:
-                self.model = torch.load(self.model_path, map_location='cpu')
-                logger.info("Model loaded as raw PyTorch model")
-                return
-            except Exception as e:
-                logger.warning(f"Raw PyTorch loading failed: {e}")
-            
-            # If all methods fail, use mock model
-            raise Exception("All PyTorch loading methods failed")
-            
-        except Exception as e:
-            logger.error(f"PyTorch model loading failed: {e}")
-            self._use_mock_model()
-    
-    def _load_onnx_model(self):
-        """Load ONNX model (.onnx file)"""
-        try:
-            import onnxruntime as ort
-            self.model = ort.InferenceSession(self.model_path)
-            logger.info("ONNX model loaded successfully")
-        except ImportError:
-            logger.error("ONNX Runtime not installed")
-            self._use_mock_model()
-        except Exception as e:
-            logger.error(f"ONNX model loading failed: {e}")
-            self._use_mock_model()
-    
-    def _load_tensorflow_model(self):
-        """Load TensorFlow model (.pb file)"""
-        try:
-            import tensorflow as tf
-            self.model = tf.saved_model.load(self.model_path)
-            logger.info("TensorFlow model loaded successfully")
-        except ImportError:
-            logger.error("TensorFlow not installed")
-            self._use_mock_model()
-        except Exception as e:
-            logger.error(f"TensorFlow model loading failed: {e}")
-            self._use_mock_model()
-    
-    def _use_mock_model(self):
-        """Use mock model for demonstration"""
-        self.model = "mock_model"
-        self.model_type = 'mock'
-        logger.info("Using mock model for demonstration")
-    
-    def detect_in_seats(self, frame, seat_positions):
-        """
-        Detect faces/heads within seat bounding boxes
-        Returns detection results for each seat
-        """
-        detections = []
-        
-        logger.info(f"Processing {len(seat_positions)} seats with {self.model_type} model")
-        
-        for seat in seat_positions:
-            seat_id = seat['seat_id']
-            x, y, w, h = seat['x'], seat['y'], seat['width'], seat['height']
-            
-            # Validate seat coordinates
-            if x < 0 or y < 0 or w <= 0 or h <= 0:
-                detections.append(self.create_empty_detection(seat_id))
-                continue
-            
-            # Extract ROI (Region of Interest) for this seat
-            try:
-                roi = frame[int(y):int(y+h), int(x):int(x+w)]
-                
-                if roi.size == 0:
-                    detections.append(self.create_empty_detection(seat_id))
-                    continue
-                
-                # Perform detection
-                if self.model == "mock_model":
-                    detection_result = self.simulate_detection(roi, seat_id)
-                else:
-                    detection_result = self.real_detection(roi, seat_id)
-                
-                detections.append(detection_result)
-                
-            except Exception as e:
-                logger.error(f"Error processing seat {seat_id}: {e}")
-                detections.append(self.create_empty_detection(seat_id))
-        
-        return detections
-    
-    def real_detection(self, roi, seat_id):
-        """
-        Perform real YOLO detection on the ROI
-        """
-        try:
-            logger.debug(f"Running real detection for seat {seat_id}")
-            
-            # Run inference based on model type
-            if self.model_type == 'pytorch':
-                return self._pytorch_inference(roi, seat_id)
-            elif self.model_type == 'onnx':
-                return self._onnx_inference(roi, seat_id)
-            elif self.model_type == 'tensorflow':
-                return self._tensorflow_inference(roi, seat_id)
-            else:
-                return self.simulate_detection(roi, seat_id)
-                
-        except Exception as e:
-            logger.error(f"Error in real detection for seat {seat_id}: {str(e)}")
-            return self.simulate_detection(roi, seat_id)
-    
-    def _pytorch_inference(self, roi, seat_id):
-        """PyTorch model inference"""
-        try:
-            # Run inference
-            results = self.model(roi)
-            
-            # Process results based on model type
-            if hasattr(results, 'pandas'):
-                # YOLOv5 format
-                return self._process_yolov5_results(results, seat_id)
-            elif hasattr(results, 'boxes'):
-                # YOLOv8 format
-                return self._process_yolov8_results(results, seat_id)
-            else:
-                # Raw PyTorch model
-                return self._process_raw_pytorch_results(results, seat_id)
-                
-        except Exception as e:
-            logger.error(f"PyTorch inference error: {e}")
-            return self.simulate_detection(roi, seat_id)
+def _camera_result(camera, detections, timestamp):
+    result = build_frame_result(camera.session_id, camera.seat_positions, detections, timestamp,
+                                camera.options, camera_id=camera.camera_id)
+    result['camera_id'] = camera.camera_id
+    return result
+
+# Multi-camera scheduler sharing the in-process model
+camera_scheduler = stream_scheduler.StreamScheduler(
+    get_detector=lambda: current_model,
+    on_result=_camera_result,
+    round_seats=int(os.environ.get('SCHEDULER_ROUND_SEATS', stream_scheduler.DEFAULT_ROUND_SEATS))
+)
+
+def restart_inference_pool(model_path, confidence_threshold, iou_threshold, num_workers=None):
+    """
+    (Re)start the process pool of inference workers. INFERENCE_WORKERS=0 (the
+    default) keeps inference in the Flask process.
+    """
+    global inference_pool
     
-    def _process_yolov5_results(self, results, seat_id):
-        """Process YOLOv5 results"""
-        detections = results.pandas().xyxy[0]
-        
-        if len(detections) > 0:
-            # Get highest confidence detection
-            best_detection = detections.loc[detections['confidence'].idxmax()]
-            confidence = float(best_detection['confidence'])
-            
-            # Determine detection type based on class
-            class_name = str(best_detection['name']).lower()
-            gesture_type = self.classify_gesture_from_class(class_name, confidence)
-            
-            bbox = {
-                'x': int(best_detection['xmin']),
-                'y': int(best_detection['ymin']),
-                'width': int(best_detection['xmax'] - best_detection['xmin']),
-                'height': int(best_detection['ymax'] - best_detection['ymin'])
-            }
-            
-            return {
-                'seat_id': seat_id,
-                'face_detected': 'face' in class_name or 'head' in class_name or 'person' in class_name,
-                'body_detected': True,
-                'gesture_type': gesture_type,
-                'confidence': confidence,
-                'bbox': bbox
-            }
-        
-        return self.create_empty_detection(seat_id)
+    if inference_pool is not None:
+        inference_pool.shutdown()
+        inference_pool = None
     
-    def _process_yolov8_results(self, results, seat_id):
-        """Process YOLOv8 results"""
-        if results.boxes is not None and len(results.boxes) > 0:
-            # Get highest confidence detection
-            confidences = results.boxes.conf.cpu().numpy()
-            best_idx = np.argmax(confidences)
-            confidence = float(confidences[best_idx])
-            
-            # Get class
-            classes = results.boxes.cls.cpu().numpy()
-            class_id = int(classes[best_idx])
-            
-            # Map class ID to gesture (this depends on your model's classes)
-            gesture_type = self.classify_gesture_from_class_id(class_id, confidence)
-            
-            # Get bbox
-            boxes = results.boxes.xyxy.cpu().numpy()
-            box = boxes[best_idx]
-            bbox = {
-                'x': int(box[0]),
-                'y': int(box[1]),
-                'width': int(box[2] - box[0]),
-                'height': int(box[3] - box[1])
-            }
-            
-            return {
-                'seat_id': seat_id,
-                'face_detected': True,
-                'body_detected': True,
-                'gesture_type': gesture_type,
-                'confidence': confidence,
-                'bbox': bbox
+    if num_workers is None:
+        num_workers = int(os.environ.get('INFERENCE_WORKERS', 0))
+    if num_workers > 0:
+        inference_pool = worker_pool.InferenceWorkerPool(
+            model_path,
+            num_workers=num_workers,
+            detector_kwargs={
+                'confidence_threshold': confidence_threshold,
+                'iou_threshold': iou_threshold
             }
-        
-        return self.create_empty_detection(seat_id)
-    
-    def _onnx_inference(self, roi, seat_id):
-        """ONNX model inference"""
-        # Implement ONNX inference logic here
-        return self.simulate_detection(roi, seat_id)
-    
-    def _tensorflow_inference(self, roi, seat_id):
-        """TensorFlow model inference"""
-        # Implement TensorFlow inference logic here
-        return self.simulate_detection(roi, seat_id)
-    
-    def classify_gesture_from_class(self, class_name, confidence):
-        """Classify gesture based on class name"""
-        class_name = class_name.lower()
-        
-        if 'focused' in class_name or 'attention' in class_name:
-            return 'focused'
-        elif 'sleep' in class_name or 'drowsy' in class_name:
-            return 'sleeping'
-        elif 'phone' in class_name or 'mobile' in class_name:
-            return 'using_phone'
-        elif 'talk' in class_name or 'chat' in class_name:
-            return 'chatting'
-        elif 'write' in class_name or 'writing' in class_name:
-            return 'writing'
-        elif 'yawn' in class_name:
-            return 'yawning'
-        elif 'away' in class_name or 'distract' in class_name:
-            return 'looking_away'
-        elif 'face' in class_name or 'head' in class_name or 'person' in class_name:
-            # Default classification based on confidence
-            return self.classify_gesture_from_confidence(confidence)
-        else:
-            return 'unknown'
-    
-    def classify_gesture_from_class_id(self, class_id, confidence):
-        """Classify gesture based on class ID"""
-        # This mapping depends on your specific model
-        # Adjust according to your model's class definitions
-        gesture_map = {
-            0: 'focused',
-            1: 'looking_away',
-            2: 'sleeping',
-            3: 'using_phone',
-            4: 'chatting',
-            5: 'writing',
-            6: 'yawning'
-        }
-        
-        return gesture_map.get(class_id, self.classify_gesture_from_confidence(confidence))
-    
-    def classify_gesture_from_confidence(self, confidence):
-        """Classify gesture based on confidence level"""
-        if confidence > 0.8:
-            return 'focused'
-        elif confidence > 0.6:
-            gestures = ['focused', 'looking_away', 'writing']
-            return np.random.choice(gestures)
-        else:
-            return 'looking_away'
-    
-    def simulate_detection(self, roi, seat_id):
-        """
-        Simulate YOLO detection results for demonstration
-        """
-        import random
-        
-        # Simulate detection probabilities with realistic distribution
-        face_detected = random.random() > 0.25  # 75% chance of face detection
-        
-        if face_detected:
-            # Simulate gesture detection with realistic probabilities
-            gestures = ['focused', 'looking_away', 'sleeping', 'using_phone', 'chatting', 'writing', 'yawning']
-            # Focused is most likely, followed by looking_away
-            gesture_weights = [0.45, 0.25, 0.08, 0.08, 0.06, 0.06, 0.02]
-            gesture_type = random.choices(gestures, weights=gesture_weights)[0]
-            confidence = random.uniform(0.65, 0.95)
-        else:
-            gesture_type = 'absent'
-            confidence = 0.0
-        
-        return {
-            'seat_id': seat_id,
-            'face_detected': face_detected,
-            'body_detected': face_detected,
-            'gesture_type': gesture_type,
-            'confidence': confidence,
-            'bbox': {
-                'x': random.randint(0, 50),
-                'y': random.randint(0, 50),
-                'width': random.randint(30, 80),
-                'height': random.randint(40, 100)
-            } if face_detected else None
-        }
-    
-    def create_empty_detection(self, seat_id):
-        """Create empty detection result"""
-        return {
-            'seat_id': seat_id,
-            'face_detected': False,
-            'body_detected': False,
-            'gesture_type': 'absent',
-            'confidence': 0.0,
-            'bbox': None
-        }
-
-    def _load_custom_model(self):
-        """Load custom model format"""
-        try:
-            # Try to import and use any custom model loading logic
-            # This is a placeholder for custom model loading logic
-            logger.info("Attempting to load as custom model")
-            
-            # First try with torch (most common)
-            try:
-                self.model = torch.load(self.model_path, map_location='cpu')
-                logger.info("Loaded custom model with PyTorch")
-                self.model_type = 'pytorch_custom'
-                return
-            except Exception as e:
-                logger.warning(f"PyTorch custom loading failed: {e}")
-            
-            # Try with other frameworks or custom logic here
-            # ...
-            
-            # If all fails, use mock model
-            raise Exception("Custom model loading failed")
-            
-        except Exception as e:
-            logger.error(f"Custom model loading failed: {e}")
-            self._use_mock_model()
+        )
+    return inference_pool
 
 @app.route('/api/initialize-model', methods=['POST'])
 def initialize_model():
@@ -447,8 +89,7 @@ def initialize_model():
         
         # Determine the correct model path based on detection_model_type
         # Only use .py models
-        model_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 
-                                 'uploads', 'models', f'{detection_model_type}.py')
+        model_path = resolve_model_path(detection_model_type)
         
         logger.info(f"Using model path: {model_path}")
         
@@ -466,12 +107,16 @@ def initialize_model():
             iou_threshold=iou_threshold
         )
         
+        restart_inference_pool(model_path, confidence_threshold, iou_threshold, data.get('inference_workers'))
+        
         model_config = {
             'model_path': model_path,
             'model_type': current_model.model_type,
             'detection_model_type': detection_model_type,
             'confidence_threshold': confidence_threshold,
             'iou_threshold': iou_threshold,
+            'runtime_config': current_model.runtime_config,
+            'inference_workers': inference_pool.num_workers if inference_pool else 0,
             'status': 'active',
             'initialized_at': datetime.now().isoformat()
         }
@@ -490,10 +135,158 @@ def initialize_model():
             'message': f'Failed to initialize model: {str(e)}'
         }), 500
 
+def decode_frame(frame_data, seat_positions=None, session_id=None):
+    """
+    Decode a base64 (optionally data URL) JPEG/PNG frame; dummy frame on failure.
+    When seat_positions are given, JPEGs may be decoded at a reduced scale that
+    still leaves every seat ROI enough pixels. Returns (frame, scale).
+    """
+    frame = None
+    scale = 1
+    if frame_data:
+        try:
+            # Remove data URL prefix if present
+            if ',' in frame_data:
+                frame_data = frame_data.split(',')[1]
+            
+            # Decode base64 to image
+            img_data = base64.b64decode(frame_data)
+            nparr = np.frombuffer(img_data, np.uint8)
+            if current_model is not None:
+                frame, scale = decode_planner.decode(nparr, seat_positions, session_id, current_model.input_size,
+                                                     current_model.detection_mode == 'full_frame')
+            else:
+                frame, scale = decode_planner.decode(nparr, seat_positions, session_id)
+            
+            if frame is None:
+                raise ValueError("Failed to decode image")
+                
+            logger.debug(f"Frame decoded successfully: {frame.shape} (1/{scale} scale)")
+                
+        except Exception as e:
+            logger.warning(f"Error decoding frame: {str(e)}, using dummy frame")
+            frame = np.zeros((480, 640, 3), dtype=np.uint8)
+            scale = 1
+    else:
+        # For simulation, create a dummy frame
+        frame = np.zeros((480, 640, 3), dtype=np.uint8)
+        logger.debug("Using dummy frame")
+    
+    return frame, scale
+
+def frame_options(data):
+    """Per-request bookkeeping options; raises ValueError on invalid values"""
+    analytics_window = data.get('analytics_window')
+    presence_config = data.get('presence_config')
+    cadence = data.get('cadence')
+    return {
+        'presence_config': presence.parse_config(presence_config) if presence_config is not None else None,
+        'analytics_window': session_analytics.parse_window_frames(analytics_window) if analytics_window is not None else None,
+        'cadence': seat_cadence.parse_config(cadence) if cadence is not None else None
+    }
+
+def parse_timestamp(timestamp):
+    """Epoch milliseconds for a request timestamp; raises ValueError if it is not ISO 8601 or epoch ms"""
+    try:
+        return timeseries_store.timestamp_to_ms(timestamp)
+    except (TypeError, ValueError, AttributeError):
+        raise ValueError(f"timestamp must be an ISO 8601 datetime or epoch milliseconds, got {timestamp!r}")
+
+def build_frame_result(session_id, seat_positions, detections, timestamp, options=None, camera_id=None):
+    """
+    Attendance, summary, analytics and time-series bookkeeping for one frame's
+    detections. Returns the detect-frame response payload. When a session has
+    several cameras, camera_id keeps their presence and rolling analytics
+    apart and prefixes their seat ids in the time-series store, since every
+    camera layout numbers its seats from 1.
+    Bookkeeping failures are logged and never fail the frame.
+    """
+    options = options or {}
+    stream_id = f'{session_id}:{camera_id}' if camera_id else session_id
+    try:
+        timestamp_ms = parse_timestamp(timestamp)
+    except ValueError as e:
+        logger.warning(f"{str(e)}, using server time")
+        timestamp = datetime.now().isoformat()
+        timestamp_ms = parse_timestamp(timestamp)
+    
+    # Process each seat with student information
+    for seat in seat_positions:
+        # Add student tracking fields if not present
+        if 'student_id' not in seat:
+            seat['student_id'] = ''
+        if 'student_name' not in seat:
+            seat['student_name'] = ''
+        if 'attendance_time' not in seat:
+            seat['attendance_time'] = None
+        if 'departure_time' not in seat:
+            seat['departure_time'] = None
+    
+    # Update attendance tracking; times only change on confirmed presence transitions
+    presence_events = []
+    try:
+        presence_events = presence.get_session(stream_id, options.get('presence_config')).update(
+            timestamp, seat_positions, detections, timestamp_ms
+        )
+    except Exception as e:
+        logger.warning(f"Error updating presence for session {session_id}: {str(e)}")
+    
+    # Add student info to detection results
+    for i, detection in enumerate(detections):
+        seat = seat_positions[i]
+        detection['student_id'] = seat.get('student_id', '')
+        detection['student_name'] = seat.get('student_name', '')
+    
+    # Calculate summary statistics
+    total_seats = len(seat_positions)
+    occupied_seats = sum(1 for d in detections if d['face_detected'])
+    focused_count = sum(1 for d in detections if d['gesture_type'] == 'focused')
+    
+    # Analyze gestures
+    gesture_analysis = analyze_gestures(detections)
+    
+    summary = {
+        'total_seats': total_seats,
+        'occupied_seats': occupied_seats,
+        'focused_count': focused_count,
+        'focus_percentage': (focused_count / total_seats * 100) if total_seats > 0 else 0,
+        'timestamp': timestamp
+    }
+    
+    logger.debug(f"Detection summary: {summary}")
+    
+    # Rolling-window statistics for this session
+    analytics = None
+    if session_id:
+        try:
+            analytics = session_analytics.get_window(stream_id, options.get('analytics_window')).push(
+                timestamp_ms, detections
+            )
+        except Exception as e:
+            logger.warning(f"Error updating analytics for session {session_id}: {str(e)}")
+    
+    # Append per-seat results to the session's time-series store
+    if session_id:
+        try:
+            timeseries_store.get_store(session_id).append_frame(timestamp_ms, detections, camera_id)
+        except Exception as e:
+            logger.warning(f"Error storing time-series for session {session_id}: {str(e)}")
+    
+    return {
+        'success': True,
+        'detections': detections,
+        'summary': summary,
+        'gesture_analysis': gesture_analysis,
+        'analytics': analytics,
+        'presence_events': presence_events,
+        'session_id': session_id
+    }
+
 @app.route('/api/detect-frame', methods=['POST'])
 def detect_frame():
     global current_model
     
+    started = time.perf_counter()
     try:
         if current_model is None:
             return jsonify({
@@ -505,97 +298,43 @@ def detect_frame():
         frame_data = data.get('frame_data')
         seat_positions = data.get('seat_positions', [])
         session_id = data.get('session_id')
-        timestamp = data.get('timestamp', datetime.now().isoformat())
+        timestamp = data.get('timestamp') or datetime.now().isoformat()
+        
+        try:
+            parse_timestamp(timestamp)
+            options = frame_options(data)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
         
         logger.debug(f"Processing frame for session {session_id} with {len(seat_positions)} seats")
         
-        # Decode base64 frame data
-        frame = None
-        if frame_data:
-            try:
-                # Remove data URL prefix if present
-                if ',' in frame_data:
-                    frame_data = frame_data.split(',')[1]
-                
-                # Decode base64 to image
-                img_data = base64.b64decode(frame_data)
-                nparr = np.frombuffer(img_data, np.uint8)
-                frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-                
-                if frame is None:
-                    raise ValueError("Failed to decode image")
-                    
-                logger.debug(f"Frame decoded successfully: {frame.shape}")
-                    
-            except Exception as e:
-                logger.warning(f"Error decoding frame: {str(e)}, using dummy frame")
-                frame = np.zeros((480, 640, 3), dtype=np.uint8)
-        else:
-            # For simulation, create a dummy frame
-            frame = np.zeros((480, 640, 3), dtype=np.uint8)
-            logger.debug("Using dummy frame")
-        
-        # Process each seat with student information
-        for seat in seat_positions:
-            # Add student tracking fields if not present
-            if 'student_id' not in seat:
-                seat['student_id'] = ''
-            if 'student_name' not in seat:
-                seat['student_name'] = ''
-            if 'attendance_time' not in seat:
-                seat['attendance_time'] = None
-            if 'departure_time' not in seat:
-                seat['departure_time'] = None
+        frame, decode_scale = decode_frame(frame_data, seat_positions, session_id)
+        detect_seats = frame_decode.scale_seats(seat_positions, decode_scale)
         
         # Perform detection within seat bounding boxes
-        detections = current_model.detect_in_seats(frame, seat_positions)
-        
-        # Update attendance tracking
-        for i, detection in enumerate(detections):
-            seat = seat_positions[i]
-            # Update attendance time if this is the first time the seat is occupied
-            if detection['face_detected'] and not seat.get('attendance_time'):
-                seat['attendance_time'] = timestamp
-                detections[i]['attendance_time'] = timestamp
-            # Update departure time if the seat was previously occupied but now is not
-            elif not detection['face_detected'] and seat.get('attendance_time') and not seat.get('departure_time'):
-                seat['departure_time'] = timestamp
-                detections[i]['departure_time'] = timestamp
-            
-            # Add student info to detection results
-            detections[i]['student_id'] = seat.get('student_id', '')
-            detections[i]['student_name'] = seat.get('student_name', '')
-            detections[i]['attendance_time'] = seat.get('attendance_time')
-            detections[i]['departure_time'] = seat.get('departure_time')
-        
-        # Calculate summary statistics
-        total_seats = len(seat_positions)
-        occupied_seats = sum(1 for d in detections if d['face_detected'])
-        focused_count = sum(1 for d in detections if d['gesture_type'] == 'focused')
-        
-        # Analyze gestures
-        gesture_analysis = analyze_gestures(detections)
-        
-        summary = {
-            'total_seats': total_seats,
-            'occupied_seats': occupied_seats,
-            'focused_count': focused_count,
-            'focus_percentage': (focused_count / total_seats * 100) if total_seats > 0 else 0,
-            'timestamp': timestamp
-        }
+        detector = inference_pool if inference_pool is not None else current_model
+        detections = detector.detect_in_seats(frame, detect_seats, session_id, options['cadence'], decode_scale)
         
-        logger.debug(f"Detection summary: {summary}")
+        response_payload = build_frame_result(session_id, seat_positions, detections, timestamp, options)
         
-        return jsonify({
-            'success': True,
-            'detections': detections,
-            'summary': summary,
-            'gesture_analysis': gesture_analysis,
-            'session_id': session_id
-        })
+        hot_path_summary.record(session_id, len(seat_positions), (time.perf_counter() - started) * 1000)
+        
+        # Compact encodings are opt-in through the Accept header
+        mimetype = request.accept_mimetypes.best_match(
+            response_encoding.supported_mimetypes(), default=response_encoding.JSON_MIMETYPE
+        )
+        if mimetype != response_encoding.JSON_MIMETYPE:
+            body, mimetype = response_encoding.encode(response_payload, mimetype)
+            return Response(body, mimetype=mimetype)
+        
+        return jsonify(response_payload)
         
     except Exception as e:
         logger.error(f"Error processing frame: {str(e)}")
+        hot_path_summary.record(None, 0, (time.perf_counter() - started) * 1000, failed=True)
         return jsonify({
             'success': False,
             'message': f'Failed to process frame: {str(e)}'
@@ -638,8 +377,7 @@ def set_model_type():
             }), 400
         
         # Determine the correct model path based on model_type
-        model_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 
-                                 'uploads', 'models', f'{model_type}.py')
+        model_path = resolve_model_path(model_type)
         
         # Check if model file exists
         if not os.path.exists(model_path):
@@ -655,9 +393,17 @@ def set_model_type():
             iou_threshold=model_config.get('iou_threshold', 0.4)
         )
         
+        restart_inference_pool(
+            model_path,
+            model_config.get('confidence_threshold', 0.5),
+            model_config.get('iou_threshold', 0.4),
+            model_config.get('inference_workers')
+        )
+        
         # Update model config
         model_config['model_path'] = model_path
         model_config['model_type'] = current_model.model_type
+        model_config['runtime_config'] = current_model.runtime_config
         model_config['initialized_at'] = datetime.now().isoformat()
         
         return jsonify({
@@ -680,6 +426,11 @@ def stop_model():
     try:
         current_model = None
         model_config = {}
+        restart_inference_pool(None, None, None, num_workers=0)
+        timeseries_store.close_all()
+        session_analytics.reset_all()
+        presence.reset_all()
+        seat_cadence.reset_all()
         
         logger.info("Model stopped successfully")
         return jsonify({
@@ -694,6 +445,338 @@ def stop_model():
             'message': f'Failed to stop model: {str(e)}'
         }), 500
 
+@app.route('/api/sessions/<session_id>/timeseries', methods=['GET'])
+def get_session_timeseries(session_id):
+    """
+    Per-seat aggregates for a session time range.
+    Query params: start, end (ISO or epoch ms), seats (comma separated), timelines (0/1)
+    """
+    try:
+        store = timeseries_store.get_store(session_id, create=False)
+        if store is None:
+            return jsonify({
+                'success': False,
+                'message': f'No time-series data for session {session_id}'
+            }), 404
+        
+        try:
+            start = _parse_time_arg(request.args.get('start'))
+            end = _parse_time_arg(request.args.get('end'))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+        
+        seats = request.args.get('seats')
+        result = store.query(
+            start=start,
+            end=end,
+            seat_ids=seats.split(',') if seats else None,
+            timelines=request.args.get('timelines') in ('1', 'true')
+        )
+        
+        return jsonify({
+            'success': True,
+            'session_id': session_id,
+            **result
+        })
+        
+    except Exception as e:
+        logger.error(f"Error querying time-series: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f'Failed to query time-series: {str(e)}'
+        }), 500
+
+@app.route('/api/sessions/<session_id>/timeseries/export', methods=['GET'])
+def export_session_timeseries(session_id):
+    """Stream a session time range as CSV"""
+    store = timeseries_store.get_store(session_id, create=False)
+    if store is None:
+        return jsonify({
+            'success': False,
+            'message': f'No time-series data for session {session_id}'
+        }), 404
+    
+    try:
+        start = _parse_time_arg(request.args.get('start'))
+        end = _parse_time_arg(request.args.get('end'))
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(['timestamp', 'seat_id', 'gesture_type', 'confidence', 'face_detected'])
+        for ts, seat_id, gesture, confidence, face in store.iter_rows(start, end):
+            timestamp = datetime.fromtimestamp(ts / 1000).isoformat()
+            writer.writerow([timestamp, seat_id, gesture, f'{confidence:.3f}', int(face)])
+            if buffer.tell() >= 65536:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+    
+    return Response(generate(), mimetype='text/csv', headers={
+        'Content-Disposition': f'attachment; filename=session_{session_id}_timeseries.csv'
+    })
+
+@app.route('/api/sessions/<session_id>/close', methods=['POST'])
+def close_session(session_id):
+    """
+    Release a finished session: its time-series store (the data stays on
+    disk), rolling analytics, presence trackers and cadence state.
+    """
+    closed = timeseries_store.close_store(session_id)
+    session_analytics.drop_session(session_id)
+    presence.drop_session(session_id)
+    seat_cadence.drop_session(session_id)
+    return jsonify({
+        'success': True,
+        'message': f'Session {session_id} closed' if closed else f'Session {session_id} was not open'
+    })
+
+def _parse_time_arg(value):
+    """Accept epoch milliseconds or ISO timestamps in query strings; raises ValueError"""
+    if value is None or value == '':
+        return None
+    if value.isdigit():
+        return int(value)
+    try:
+        timeseries_store.timestamp_to_ms(value)
+    except ValueError:
+        raise ValueError(f"Invalid time {value!r}: expected ISO 8601 or epoch milliseconds")
+    return value
+
+@app.route('/api/cameras', methods=['POST'])
+def register_camera():
+    """
+    Register a camera with the scheduler. Pass 'source' (stream URL or device
+    index) for cameras the server should pull from; otherwise push frames to
+    /api/cameras/<camera_id>/frame.
+    """
+    try:
+        data = request.get_json()
+        camera_id = data.get('camera_id')
+        seat_positions = data.get('seat_positions', [])
+        
+        if not camera_id:
+            return jsonify({
+                'success': False,
+                'message': 'camera_id is required'
+            }), 400
+        
+        try:
+            options = frame_options(data)
+            weight, min_rate = stream_scheduler.parse_camera_settings(
+                data.get('weight'), data.get('min_rate', stream_scheduler.DEFAULT_MIN_RATE)
+            )
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+        
+        camera = camera_scheduler.add_camera(
+            camera_id,
+            data.get('session_id'),
+            seat_positions,
+            weight=weight,
+            min_rate=min_rate,
+            source=data.get('source'),
+            options=options
+        )
+        
+        return jsonify({
+            'success': True,
+            'message': f'Camera {camera_id} registered',
+            'camera': camera.metrics(time.monotonic())
+        })
+        
+    except Exception as e:
+        logger.error(f"Error registering camera: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f'Failed to register camera: {str(e)}'
+        }), 500
+
+@app.route('/api/cameras/<camera_id>', methods=['DELETE'])
+def remove_camera(camera_id):
+    if not camera_scheduler.remove_camera(camera_id):
+        return jsonify({
+            'success': False,
+            'message': f'Camera {camera_id} not registered'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'message': f'Camera {camera_id} removed'
+    })
+
+@app.route('/api/cameras/<camera_id>/frame', methods=['POST'])
+def submit_camera_frame(camera_id):
+    """
+    Queue a frame for a registered camera. Replaces any frame still waiting.
+    With 'wait' set, blocks up to 'timeout' seconds for this frame's result;
+    otherwise returns the camera's latest result immediately.
+    """
+    try:
+        if camera_id not in camera_scheduler.cameras:
+            return jsonify({
+                'success': False,
+                'message': f'Camera {camera_id} not registered'
+            }), 404
+        
+        data = request.get_json()
+        timestamp = data.get('timestamp') or datetime.now().isoformat()
+        try:
+            parse_timestamp(timestamp)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+        
+        # Scheduled cameras run on full-resolution seat coordinates
+        frame, _ = decode_frame(data.get('frame_data'))
+        seq = camera_scheduler.submit_frame(camera_id, frame, timestamp)
+        
+        if data.get('wait'):
+            result, error = camera_scheduler.wait_result(camera_id, seq, float(data.get('timeout', 10)))
+            if error is not None:
+                return jsonify({
+                    'success': False,
+                    'frame_seq': seq,
+                    'message': f"Inference failed for frame {error['frame_seq']}: {error['message']}"
+                }), 500
+        else:
+            result = camera_scheduler.latest_result(camera_id)
+        
+        return jsonify({
+            'success': True,
+            'frame_seq': seq,
+            'result': result
+        })
+        
+    except Exception as e:
+        logger.error(f"Error submitting frame for camera {camera_id}: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f'Failed to submit frame: {str(e)}'
+        }), 500
+
+@app.route('/api/cameras/<camera_id>/result', methods=['GET'])
+def get_camera_result(camera_id):
+    if camera_id not in camera_scheduler.cameras:
+        return jsonify({
+            'success': False,
+            'message': f'Camera {camera_id} not registered'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'result': camera_scheduler.latest_result(camera_id),
+        'error': camera_scheduler.latest_error(camera_id)
+    })
+
+@app.route('/api/cameras/metrics', methods=['GET'])
+def get_camera_metrics():
+    return jsonify({
+        'success': True,
+        'round_seats': camera_scheduler.round_seats,
+        'cameras': camera_scheduler.metrics()
+    })
+
+@app.route('/api/workers', methods=['GET'])
+def get_worker_status():
+    if inference_pool is None:
+        return jsonify({
+            'status': 'inactive',
+            'message': 'Inference runs in the Flask process'
+        })
+    
+    return jsonify({
+        'status': 'active',
+        **inference_pool.status()
+    })
+
+@app.route('/api/autotune', methods=['POST'])
+def autotune_model():
+    """
+    Benchmark thread/batch/detection-mode settings for the loaded model on this
+    host and persist the best configuration. Blocks until the grid is done.
+    Pass 'frame_data' (a captured classroom frame, with 'seat_positions' in
+    its coordinates) to tune on real content; otherwise a noise frame is used.
+    Trials run on a separate detector instance; the live model only receives
+    the winning configuration, and running inference workers are restarted
+    to load it. Thread counts are process-wide, so concurrent requests may
+    run with a trial's thread settings until the grid finishes.
+    """
+    try:
+        live_model = current_model
+        if live_model is None:
+            return jsonify({
+                'success': False,
+                'message': 'Model not initialized'
+            }), 400
+        
+        data = request.get_json() or {}
+        frame = None
+        if data.get('frame_data'):
+            frame, _ = decode_frame(data['frame_data'])
+        
+        candidate = YOLODetector(
+            model_path=live_model.model_path,
+            confidence_threshold=live_model.confidence_threshold,
+            iou_threshold=live_model.iou_threshold
+        )
+        try:
+            result = autotune.run_autotune(
+                candidate,
+                seat_positions=data.get('seat_positions'),
+                seat_count=data.get('seat_count'),
+                frame=frame,
+                frame_width=data.get('frame_width', 1280),
+                frame_height=data.get('frame_height', 720),
+                iterations=data.get('iterations', 5),
+                max_trials=data.get('max_trials')
+            )
+            live_model.apply_runtime_config(result['best']['config'])
+        except Exception:
+            # Put the process-wide thread settings back to the live model's
+            live_model.apply_runtime_config(live_model.runtime_config)
+            raise
+        
+        model_config['runtime_config'] = live_model.runtime_config
+        
+        # Workers read the saved profile when they load the model
+        workers_restarted = 0
+        if inference_pool is not None:
+            workers_restarted = inference_pool.num_workers
+            restart_inference_pool(live_model.model_path, live_model.confidence_threshold,
+                                   live_model.iou_threshold, workers_restarted)
+        
+        return jsonify({
+            'success': True,
+            'message': f"Autotune complete ({result['best']['median_ms']:.1f} ms/frame)",
+            'profile_key': result['profile_key'],
+            'best': result['best'],
+            'trials': result['trials'],
+            'tuned_on': 'frame_data' if frame is not None else 'synthetic',
+            'inference_workers_restarted': workers_restarted
+        })
+        
+    except Exception as e:
+        logger.error(f"Error running autotune: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f'Failed to run autotune: {str(e)}'
+        }), 500
+
 def analyze_gestures(detections):
     """Analyze gesture distribution from detections"""
     gesture_counts = {}
@@ -741,6 +824,14 @@ if __name__ == '__main__':
     logger.info("  POST /api/detect-frame")
     logger.info("  GET  /api/model-status")
     logger.info("  POST /api/stop-model")
+    logger.info("  POST /api/autotune")
+    logger.info("  GET  /api/workers")
+    logger.info("  POST /api/cameras")
+    logger.info("  POST /api/cameras/<camera_id>/frame")
+    logger.info("  GET  /api/cameras/metrics")
+    logger.info("  GET  /api/sessions/<session_id>/timeseries")
+    logger.info("  GET  /api/sessions/<session_id>/timeseries/export")
+    logger.info("  POST /api/sessions/<session_id>/close")
     logger.info("  GET  /health")
     
     app.run(host='0.0.0.0', port=5001, debug=True)
\ No newline at end of file
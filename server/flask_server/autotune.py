@@ -0,0 +1,241 @@
+"""
+Runtime autotuner for the YOLO detector.
+
+Benchmarks a grid of thread/batch/detection-mode settings on the current host
+with the loaded model and a session's seat layout, and persists the best
+configuration per model and host core count so YOLODetector can apply it at
+load time.
+
+Usage:
+    python autotune.py --model model_1 --seats 40
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PROFILE_PATH = os.environ.get(
+    'AUTOTUNE_PROFILE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'autotune_profiles.json')
+)
+
+DETECTION_MODES = ['seat_crop', 'full_frame']
+BATCH_SIZES = [1, 4, 8, 16]
+
+
+def host_cores():
+    return os.cpu_count() or 1
+
+
+def profile_key(model_path, cores=None):
+    """Profiles are keyed by model file name and host core count"""
+    return f"{os.path.basename(model_path)}@{cores or host_cores()}cores"
+
+
+def _read_profiles():
+    if not os.path.exists(PROFILE_PATH):
+        return {}
+    try:
+        with open(PROFILE_PATH, 'r') as f:
+            return json.load(f)
+    except Exception as e:
+        logger.warning(f"Could not read autotune profiles: {e}")
+        return {}
+
+
+def load_profile(model_path):
+    """Return the stored best configuration for this model on this host, or None"""
+    entry = _read_profiles().get(profile_key(model_path))
+    return entry.get('config') if entry else None
+
+
+def save_profile(model_path, config, stats=None):
+    profiles = _read_profiles()
+    profiles[profile_key(model_path)] = {
+        'config': config,
+        'stats': stats or {},
+        'tuned_at': datetime.now().isoformat()
+    }
+    tmp_path = PROFILE_PATH + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(profiles, f, indent=2)
+    os.replace(tmp_path, PROFILE_PATH)
+    logger.info(f"Saved autotune profile {profile_key(model_path)}: {config}")
+
+
+def apply_thread_settings(config):
+    """Apply process-wide torch and OpenCV thread counts"""
+    torch_threads = config.get('torch_threads')
+    if torch_threads:
+        try:
+            import torch
+            torch.set_num_threads(int(torch_threads))
+        except ImportError:
+            pass
+    cv2_threads = config.get('cv2_threads')
+    if cv2_threads is not None:
+        cv2.setNumThreads(int(cv2_threads))
+
+
+def thread_candidates(cores=None):
+    """Powers of two up to the core count, always including the core count"""
+    cores = cores or host_cores()
+    candidates = []
+    n = 1
+    while n < cores:
+        candidates.append(n)
+        n *= 2
+    candidates.append(cores)
+    return candidates
+
+
+def build_grid(model_type, cores=None):
+    """
+    Build the list of candidate configurations.
+    ONNX Runtime threads are only varied for ONNX models, and batching /
+    full-frame mode only apply to PyTorch models.
+    """
+    cores = cores or host_cores()
+    threads = thread_candidates(cores)
+    cv2_threads = sorted({0, 1, cores})
+
+    if model_type == 'pytorch':
+        batch_sizes, modes = BATCH_SIZES, DETECTION_MODES
+    else:
+        batch_sizes, modes = [1], ['seat_crop']
+
+    grid = []
+    for torch_threads, cv_threads, batch_size, mode in itertools.product(threads, cv2_threads, batch_sizes, modes):
+        if mode == 'full_frame' and batch_size != 1:
+            # Full-frame mode runs one forward pass per frame, batch size is irrelevant
+            continue
+        grid.append({
+            'torch_threads': torch_threads,
+            'cv2_threads': cv_threads,
+            'ort_threads': torch_threads if model_type == 'onnx' else None,
+            'batch_size': batch_size,
+            'detection_mode': mode
+        })
+    return grid
+
+
+def synthetic_seats(seat_count, frame_width=1280, frame_height=720):
+    """Lay out seat_count seats as an even grid over the frame"""
+    cols = max(1, int(np.ceil(np.sqrt(seat_count * frame_width / frame_height))))
+    rows = max(1, int(np.ceil(seat_count / cols)))
+    w, h = frame_width // cols, frame_height // rows
+    return [
+        {'seat_id': i + 1, 'x': (i % cols) * w, 'y': (i // cols) * h, 'width': w, 'height': h}
+        for i in range(seat_count)
+    ]
+
+
+def benchmark_config(detector, config, frame, seat_positions, iterations=5, warmup=1):
+    """Apply a configuration to the detector and time detect_in_seats"""
+    detector.apply_runtime_config(config)
+    for _ in range(warmup):
+        detector.detect_in_seats(frame, seat_positions)
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        detector.detect_in_seats(frame, seat_positions)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        'median_ms': float(np.median(timings)),
+        'p90_ms': float(np.percentile(timings, 90)),
+        'fps': 1000.0 / float(np.median(timings)) if np.median(timings) > 0 else 0.0
+    }
+
+
+def run_autotune(detector, seat_positions=None, seat_count=None, frame=None,
+                 frame_width=1280, frame_height=720, iterations=5, max_trials=None, save=True):
+    """
+    Benchmark the configuration grid against the detector's loaded model and
+    persist the fastest configuration. The detector is reconfigured for every
+    trial, so pass an instance that is not serving requests; it is left
+    running the winner.
+    """
+    if frame is None:
+        frame = np.random.randint(0, 255, (frame_height, frame_width, 3), dtype=np.uint8)
+    frame_height, frame_width = frame.shape[:2]
+    if not seat_positions:
+        seat_positions = synthetic_seats(seat_count or 30, frame_width, frame_height)
+
+    grid = build_grid(detector.model_type)
+    if max_trials:
+        grid = grid[:max_trials]
+
+    logger.info(f"Autotuning {detector.model_type} model over {len(grid)} configurations "
+                f"with {len(seat_positions)} seats on {host_cores()} cores")
+
+    previous_config = dict(detector.runtime_config)
+    trials = []
+    for config in grid:
+        try:
+            result = benchmark_config(detector, config, frame, seat_positions, iterations)
+            trials.append({'config': config, **result})
+            logger.debug(f"Autotune trial {config}: {result['median_ms']:.1f} ms")
+        except Exception as e:
+            logger.warning(f"Autotune trial {config} failed: {e}")
+
+    if not trials:
+        detector.apply_runtime_config(previous_config)
+        raise RuntimeError("All autotune trials failed")
+
+    trials.sort(key=lambda t: t['median_ms'])
+    best = trials[0]
+    detector.apply_runtime_config(best['config'])
+
+    stats = {
+        'median_ms': best['median_ms'],
+        'fps': best['fps'],
+        'seat_count': len(seat_positions),
+        'frame_size': [frame_width, frame_height],
+        'trials': len(trials)
+    }
+    if save:
+        save_profile(detector.model_path, best['config'], stats)
+
+    logger.info(f"Autotune best config: {best['config']} ({best['median_ms']:.1f} ms/frame)")
+    return {'best': best, 'trials': trials, 'profile_key': profile_key(detector.model_path)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Autotune detector runtime settings for this host')
+    parser.add_argument('--model', default='model_1', help='Detection model name (model_1, model_2)')
+    parser.add_argument('--seats', type=int, default=30, help='Number of seats in the session layout')
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--max-trials', type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    from detector import YOLODetector, resolve_model_path
+
+    detector = YOLODetector(model_path=resolve_model_path(args.model))
+    result = run_autotune(
+        detector,
+        seat_count=args.seats,
+        frame_width=args.width,
+        frame_height=args.height,
+        iterations=args.iterations,
+        max_trials=args.max_trials
+    )
+
+    print(f"\nProfile: {result['profile_key']}")
+    print(f"Best: {result['best']['config']}")
+    print(f"      {result['best']['median_ms']:.1f} ms/frame ({result['best']['fps']:.1f} FPS)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+"""
+Micro-benchmarks for the detect-frame hot path.
+
+Usage:
+    python benchmark.py encoding --seats 60
+    python benchmark.py workers --model model_1 --workers 1,2,4,8
+    python benchmark.py logging --seats 60 --seat-errors 3
+    python benchmark.py decode --resolutions 1280x720,1920x1080 --grids 2,3,4
+"""
+import argparse
+import logging
+import logging.handlers
+import os
+import queue
+import tempfile
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+import logging_setup
+import response_encoding
+from gestures import GESTURE_TYPES
+
+
+def sample_payload(seats):
+    """A detect-frame payload shaped like the real response"""
+    detections = []
+    for seat_id in range(1, seats + 1):
+        face = random.random() > 0.25
+        detections.append({
+            'seat_id': seat_id,
+            'face_detected': face,
+            'body_detected': face,
+            'gesture_type': random.choice(GESTURE_TYPES[1:-1]) if face else 'absent',
+            'confidence': random.uniform(0.65, 0.95) if face else 0.0,
+            'bbox': {'x': random.randint(0, 50), 'y': random.randint(0, 50),
+                     'width': random.randint(30, 80), 'height': random.randint(40, 100)} if face else None,
+            'presence_state': 'present' if face else 'absent',
+            'attendance_time': datetime.now().isoformat() if face else None,
+            'departure_time': None,
+            'student_id': f'S{seat_id:04d}',
+            'student_name': f'Student {seat_id}'
+        })
+    return {
+        'success': True,
+        'detections': detections,
+        'summary': {'total_seats': seats, 'timestamp': datetime.now().isoformat()},
+        'session_id': 'benchmark'
+    }
+
+
+def time_call(fn, iterations):
+    fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        result = fn()
+    return (time.perf_counter() - start) / iterations * 1000, result
+
+
+def bench_encoding(args):
+    payload = sample_payload(args.seats)
+    mimetypes = response_encoding.supported_mimetypes()
+    if response_encoding.MSGPACK_MIMETYPE not in mimetypes:
+        print("msgpack not installed, skipping MessagePack")
+
+    print(f"detect-frame response encoding, {args.seats} seats, {args.iterations} iterations")
+    print(f"{'format':<40}{'ms/encode':>12}{'bytes':>10}")
+    baseline = None
+    for mimetype in mimetypes:
+        ms, (body, _) = time_call(lambda: response_encoding.encode(payload, mimetype), args.iterations)
+        size = len(body.encode() if isinstance(body, str) else body)
+        baseline = baseline or size
+        print(f"{mimetype:<40}{ms:>12.3f}{size:>10} ({size / baseline * 100:.0f}%)")
+
+
+def bench_workers(args):
+    from detector import resolve_model_path
+    from autotune import synthetic_seats
+    from worker_pool import InferenceWorkerPool
+
+    frame = np.random.randint(0, 255, (args.height, args.width, 3), dtype=np.uint8)
+    seat_positions = synthetic_seats(args.seats, args.width, args.height)
+
+    print(f"Inference worker throughput, {args.seats} seats, {args.width}x{args.height} frames")
+    print(f"{'workers':<10}{'frames/s':>12}{'speedup':>10}")
+    baseline = None
+    for num_workers in [int(n) for n in args.workers.split(',')]:
+        pool = InferenceWorkerPool(resolve_model_path(args.model), num_workers=num_workers)
+        try:
+            pool.detect_in_seats(frame, seat_positions)
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=num_workers) as executor:
+                list(executor.map(lambda _: pool.detect_in_seats(frame, seat_positions), range(args.frames)))
+            fps = args.frames / (time.perf_counter() - start)
+        finally:
+            pool.shutdown()
+        baseline = baseline or fps
+        print(f"{num_workers:<10}{fps:>12.1f}{fps / baseline:>9.2f}x")
+
+
+def grid_seats(rows, cols, width, height, padding=30):
+    """Seat layout generated the same way as the live monitoring page"""
+    seat_width = (width - (cols + 1) * padding) // cols
+    seat_height = (height - (rows + 1) * padding) // rows
+    return [
+        {'seat_id': row * cols + col + 1, 'x': padding + col * (seat_width + padding),
+         'y': padding + row * (seat_height + padding), 'width': seat_width, 'height': seat_height}
+        for row in range(rows) for col in range(cols)
+    ]
+
+
+def sample_jpeg(width, height, quality=80):
+    """A camera-like JPEG: smooth structure plus sensor noise, encoded like the browser capture"""
+    import cv2
+
+    rng = np.random.default_rng(0)
+    base = cv2.resize(rng.integers(0, 255, (height // 16, width // 16, 3), dtype=np.uint8), (width, height),
+                      interpolation=cv2.INTER_CUBIC)
+    noisy = np.clip(base.astype(np.int16) + rng.integers(-8, 8, base.shape), 0, 255).astype(np.uint8)
+    _, encoded = cv2.imencode('.jpg', noisy, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return np.frombuffer(encoded.tobytes(), np.uint8)
+
+
+def bench_decode(args):
+    import cv2
+    import frame_decode
+
+    print(f"detect-frame JPEG decode, input size {args.input_size}, "
+          f"min seat side {frame_decode.min_roi_pixels_for(args.input_size)} px")
+    print(f"{'resolution':<12}{'grid':<6}{'seat side':>10}{'scale':>7}{'full ms':>10}{'planned ms':>12}{'speedup':>9}")
+    for resolution in args.resolutions.split(','):
+        width, height = (int(v) for v in resolution.split('x'))
+        data = sample_jpeg(width, height)
+        full_ms, _ = time_call(lambda: cv2.imdecode(data, cv2.IMREAD_COLOR), args.iterations)
+        for grid in (int(g) for g in args.grids.split(',')):
+            seats = grid_seats(grid, grid, width, height)
+            planner = frame_decode.DecodePlanner()
+            planner.decode(data, seats, 'benchmark', args.input_size)
+            planned_ms, (_, scale) = time_call(lambda: planner.decode(data, seats, 'benchmark', args.input_size),
+                                               args.iterations)
+            side = min(min(s['width'], s['height']) for s in seats)
+            print(f"{resolution:<12}{f'{grid}x{grid}':<6}{side:>10}{f'1/{scale}':>7}"
+                  f"{full_ms:>10.2f}{planned_ms:>12.2f}{full_ms / planned_ms:>8.2f}x")
+
+
+def _bench_logger(name, handlers, level=logging.INFO):
+    bench_logger = logging.getLogger(f'benchmark.{name}')
+    bench_logger.handlers = handlers
+    bench_logger.setLevel(level)
+    bench_logger.propagate = False
+    return bench_logger
+
+
+def bench_logging(args):
+    log_dir = tempfile.mkdtemp()
+    devnull = open(os.devnull, 'w')
+
+    def sink_handlers(name):
+        formatter = logging.Formatter(logging_setup.LOG_FORMAT)
+        handlers = [logging.FileHandler(os.path.join(log_dir, f'{name}.log')), logging.StreamHandler(devnull)]
+        for handler in handlers:
+            handler.setFormatter(formatter)
+        return handlers
+
+    # Previous setup: synchronous file + console handlers, one line per frame and per failing seat
+    sync_logger = _bench_logger('sync', sink_handlers('sync'))
+
+    def sync_frame():
+        sync_logger.info(f"Processing {args.seats} seats with pytorch model")
+        for seat_id in range(args.seat_errors):
+            sync_logger.error(f"Error processing seat {seat_id}: crop out of bounds")
+
+    # Current setup: queue handler with rate limiting, per-frame details folded into summaries
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(logging_setup.RateLimitFilter())
+    async_logger = _bench_logger('async', [queue_handler])
+    listener = logging.handlers.QueueListener(log_queue, *sink_handlers('async'))
+    listener.start()
+    summary = logging_setup.HotPathSummary(async_logger)
+
+    def async_frame():
+        async_logger.debug(f"Processing {args.seats} seats with pytorch model")
+        if args.seat_errors:
+            async_logger.error(f"Error processing {args.seat_errors} seats (first: seat 0: crop out of bounds)")
+        summary.record('benchmark', args.seats, 10.0)
+
+    print(f"Hot-path logging cost per frame, {args.seats} seats, {args.seat_errors} failing seats, "
+          f"{args.iterations} frames")
+    for label, frame_fn in [('sync file+console', sync_frame), ('queue + sampled', async_frame)]:
+        timings = np.empty(args.iterations)
+        for i in range(args.iterations):
+            start = time.perf_counter()
+            frame_fn()
+            timings[i] = (time.perf_counter() - start) * 1e6
+        print(f"{label:<20} mean {timings.mean():>8.1f} us   p99 {np.percentile(timings, 99):>8.1f} us")
+
+    listener.stop()
+    devnull.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark detect-frame hot path components')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    encoding = subparsers.add_parser('encoding', help='Response serialization time and payload size')
+    encoding.add_argument('--seats', type=int, default=60)
+    encoding.add_argument('--iterations', type=int, default=1000)
+    encoding.set_defaults(func=bench_encoding)
+
+    workers = subparsers.add_parser('workers', help='Process-pool inference throughput')
+    workers.add_argument('--model', default='model_1')
+    workers.add_argument('--workers', default='1,2,4')
+    workers.add_argument('--seats', type=int, default=30)
+    workers.add_argument('--frames', type=int, default=200)
+    workers.add_argument('--width', type=int, default=1280)
+    workers.add_argument('--height', type=int, default=720)
+    workers.set_defaults(func=bench_workers)
+
+    decode = subparsers.add_parser('decode', help='Full vs ROI-planned reduced JPEG decode')
+    decode.add_argument('--resolutions', default='1280x720,1920x1080')
+    decode.add_argument('--grids', default='2,3,4')
+    decode.add_argument('--input-size', type=int, default=640)
+    decode.add_argument('--iterations', type=int, default=100)
+    decode.set_defaults(func=bench_decode)
+
+    logging_bench = subparsers.add_parser('logging', help='Per-frame logging latency, sync vs queued')
+    logging_bench.add_argument('--seats', type=int, default=60)
+    logging_bench.add_argument('--seat-errors', type=int, default=0)
+    logging_bench.add_argument('--iterations', type=int, default=5000)
+    logging_bench.set_defaults(func=bench_logging)
+
+    args = parser.parse_args()
+    random.seed(0)
+    np.random.seed(0)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
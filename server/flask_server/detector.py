@@ -0,0 +1,569 @@
+"""
+YOLO seat detector shared by the Flask app, inference workers and the
+offline tools. Importing it does not create the Flask app or its logging.
+"""
+import logging
+import os
+
+import numpy as np
+import torch
+
+import autotune
+import frame_decode
+import seat_cadence
+
+logger = logging.getLogger(__name__)
+
+
+class YOLODetector:
+    def __init__(self, model_path, confidence_threshold=0.5, iou_threshold=0.4, model_type=None):
+        self.model_path = model_path
+        self.confidence_threshold = confidence_threshold
+        self.iou_threshold = iou_threshold
+        self.model = None
+        self.model_type = model_type or 'unknown'
+        self.input_size = 640
+        self.batch_size = 1
+        self.detection_mode = 'seat_crop'
+        self.ort_threads = None
+        self.runtime_config = {}
+
+        # Apply the autotuned runtime settings for this model/host before loading,
+        # so ONNX Runtime sessions pick up their thread count
+        profile = autotune.load_profile(self.model_path)
+        if profile:
+            logger.info(f"Applying autotune profile: {profile}")
+            self.apply_runtime_config(profile, reload=False)
+
+        self.load_model()
+    
+    def apply_runtime_config(self, config, reload=True):
+        """Apply thread, batch size and detection mode settings"""
+        config = config or {}
+        autotune.apply_thread_settings(config)
+        self.batch_size = max(1, int(config.get('batch_size') or 1))
+        self.detection_mode = config.get('detection_mode') or 'seat_crop'
+
+        ort_threads = config.get('ort_threads')
+        ort_changed = ort_threads != self.ort_threads
+        self.ort_threads = ort_threads
+        self.runtime_config = dict(config)
+
+        # ONNX Runtime thread counts are fixed per session, so rebuild it
+        if reload and ort_changed and self.model_type == 'onnx':
+            self._load_onnx_model()
+    
+    def load_model(self):
+        try:
+            logger.info(f"Loading model from {self.model_path}")
+            
+            # Check if model file exists
+            if not os.path.exists(self.model_path):
+                raise FileNotFoundError(f"Model file not found: {self.model_path}")
+            
+            # Get file size for logging
+            file_size = os.path.getsize(self.model_path) / (1024 * 1024)  # MB
+            logger.info(f"Model file size: {file_size:.2f} MB")
+            
+            # If model_type is already specified, use that directly
+            if self.model_type in ['pytorch', 'onnx', 'tensorflow', 'custom']:
+                logger.info(f"Using specified model type: {self.model_type}")
+                if self.model_type == 'pytorch':
+                    self._load_pytorch_model()
+                elif self.model_type == 'onnx':
+                    self._load_onnx_model()
+                elif self.model_type == 'tensorflow':
+                    self._load_tensorflow_model()
+                elif self.model_type == 'custom':
+                    self._load_custom_model()
+            else:
+                # Try to load the model based on file extension
+                if self.model_path.endswith('.py'):
+                    self.model_type = 'python_model'
+                    self._load_custom_model()
+                elif self.model_path.endswith('.pt') or self.model_path.endswith('.pth'):
+                    self.model_type = 'pytorch'
+                    self._load_pytorch_model()
+                elif self.model_path.endswith('.onnx'):
+                    self.model_type = 'onnx'
+                    self._load_onnx_model()
+                elif self.model_path.endswith('.pb') or self.model_path.endswith('.h5') or self.model_path.endswith('.keras'):
+                    self.model_type = 'tensorflow'
+                    self._load_tensorflow_model()
+                else:
+                    logger.warning(f"Unknown model format: {self.model_path}, attempting to load as custom model")
+                    self._load_custom_model()
+                
+        except Exception as e:
+            logger.error(f"Error loading model: {str(e)}")
+            self._use_mock_model()
+    
+    def _load_pytorch_model(self):
+        """Load PyTorch model (.pt file)"""
+        try:
+            # Try loading with ultralytics YOLOv8 first
+            try:
+                from ultralytics import YOLO
+                self.model = YOLO(self.model_path)
+                logger.info("Model loaded successfully with ultralytics YOLO")
+                return
+            except ImportError:
+                logger.info("Ultralytics not available, trying torch.hub")
+            except Exception as e:
+                logger.warning(f"Ultralytics loading failed: {e}")
+            
+            # Try loading with torch.hub (YOLOv5)
+            try:
+                self.model = torch.hub.load('ultralytics/yolov5', 'custom', path=self.model_path, force_reload=True)
+                logger.info("Model loaded successfully with torch.hub YOLOv5")
+                return
+            except Exception as e:
+                logger.warning(f"Torch.hub loading failed: {e}")
+            
+            # Try loading as raw PyTorch model
+            try:
+                self.model = torch.load(self.model_path, map_location='cpu')
+                logger.info("Model loaded as raw PyTorch model")
+                return
+            except Exception as e:
+                logger.warning(f"Raw PyTorch loading failed: {e}")
+            
+            # If all methods fail, use mock model
+            raise Exception("All PyTorch loading methods failed")
+            
+        except Exception as e:
+            logger.error(f"PyTorch model loading failed: {e}")
+            self._use_mock_model()
+    
+    def _load_onnx_model(self):
+        """Load ONNX model (.onnx file)"""
+        try:
+            import onnxruntime as ort
+            session_options = ort.SessionOptions()
+            if self.ort_threads:
+                session_options.intra_op_num_threads = int(self.ort_threads)
+                session_options.inter_op_num_threads = 1
+            self.model = ort.InferenceSession(self.model_path, sess_options=session_options)
+            logger.info("ONNX model loaded successfully")
+        except ImportError:
+            logger.error("ONNX Runtime not installed")
+            self._use_mock_model()
+        except Exception as e:
+            logger.error(f"ONNX model loading failed: {e}")
+            self._use_mock_model()
+    
+    def _load_tensorflow_model(self):
+        """Load TensorFlow model (.pb file)"""
+        try:
+            import tensorflow as tf
+            self.model = tf.saved_model.load(self.model_path)
+            logger.info("TensorFlow model loaded successfully")
+        except ImportError:
+            logger.error("TensorFlow not installed")
+            self._use_mock_model()
+        except Exception as e:
+            logger.error(f"TensorFlow model loading failed: {e}")
+            self._use_mock_model()
+    
+    def _use_mock_model(self):
+        """Use mock model for demonstration"""
+        self.model = "mock_model"
+        self.model_type = 'mock'
+        logger.info("Using mock model for demonstration")
+    
+    def detect_in_seats(self, frame, seat_positions, session_id=None, cadence_config=None, decode_scale=1):
+        """
+        Detect faces/heads within seat bounding boxes
+        Returns detection results for each seat. With a session_id, stable
+        seats are only re-checked every Nth frame (see seat_cadence).
+        For a frame decoded at 1/decode_scale, bboxes are mapped back to
+        full-resolution pixels before cadence keeps them for carrying forward.
+        """
+        def infer(seats):
+            return frame_decode.restore_bboxes(self.detect_in_frames([(frame, seats)])[0], decode_scale)
+        
+        if session_id is not None:
+            return seat_cadence.run_with_cadence(
+                seat_cadence.get_session(session_id, cadence_config),
+                seat_positions,
+                infer
+            )
+        return infer(seat_positions)
+    
+    def detect_in_frames(self, frames):
+        """
+        Detect within seat bounding boxes for several (frame, seat_positions)
+        pairs, e.g. one per camera. Seat ROIs from all frames share the
+        batched forward passes. Returns one detection list per frame.
+        """
+        all_detections = []
+        pending = []
+        seat_errors = []
+        
+        for frame, seat_positions in frames:
+            logger.debug(f"Processing {len(seat_positions)} seats with {self.model_type} model")
+            
+            if self.detection_mode == 'full_frame' and self.model_type == 'pytorch':
+                full_frame_detections = self._full_frame_detection(frame, seat_positions)
+                if full_frame_detections is not None:
+                    all_detections.append(full_frame_detections)
+                    continue
+            
+            detections = []
+            for seat in seat_positions:
+                seat_id = seat['seat_id']
+                x, y, w, h = seat['x'], seat['y'], seat['width'], seat['height']
+                
+                # Validate seat coordinates
+                if x < 0 or y < 0 or w <= 0 or h <= 0:
+                    detections.append(self.create_empty_detection(seat_id))
+                    continue
+                
+                # Extract ROI (Region of Interest) for this seat
+                try:
+                    roi = frame[int(y):int(y+h), int(x):int(x+w)]
+                    
+                    if roi.size == 0:
+                        detections.append(self.create_empty_detection(seat_id))
+                        continue
+                    
+                    # Perform detection
+                    if self.model == "mock_model":
+                        detection_result = self.simulate_detection(roi, seat_id)
+                    elif self.batch_size > 1 and self.model_type == 'pytorch':
+                        # Defer to a batched forward pass below
+                        pending.append((detections, len(detections), roi, seat_id))
+                        detection_result = None
+                    else:
+                        detection_result = self.real_detection(roi, seat_id)
+                    
+                    detections.append(detection_result)
+                    
+                except Exception as e:
+                    seat_errors.append(f"{seat_id}: {e}")
+                    detections.append(self.create_empty_detection(seat_id))
+            
+            all_detections.append(detections)
+        
+        # One line per call rather than one per failing seat
+        if seat_errors:
+            logger.error(f"Error processing {len(seat_errors)} seats (first: seat {seat_errors[0]})")
+        
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            for (detections, index, _, _), result in zip(batch, self._batched_detection(batch)):
+                detections[index] = result
+        
+        return all_detections
+    
+    def _batched_detection(self, batch):
+        """Run one forward pass over several seat ROIs"""
+        try:
+            results = self.model([roi for _, _, roi, _ in batch])
+            if isinstance(results, list) and len(results) == len(batch) and all(hasattr(r, 'boxes') for r in results):
+                return [self._process_yolov8_results(r, seat_id) for r, (_, _, _, seat_id) in zip(results, batch)]
+        except Exception as e:
+            logger.warning(f"Batched inference failed, falling back to per-seat inference: {e}")
+        return [self.real_detection(roi, seat_id) for _, _, roi, seat_id in batch]
+    
+    def _full_frame_detection(self, frame, seat_positions):
+        """
+        Run a single forward pass on the whole frame and assign each box to the
+        seat containing its center. Returns None if the model output is not
+        in YOLOv8 format so the caller can fall back to per-seat crops.
+        """
+        try:
+            results = self.model(frame)
+            result = results[0] if isinstance(results, list) else results
+            if not hasattr(result, 'boxes'):
+                return None
+            
+            if result.boxes is not None and len(result.boxes) > 0:
+                boxes = result.boxes.xyxy.cpu().numpy()
+                confidences = result.boxes.conf.cpu().numpy()
+                classes = result.boxes.cls.cpu().numpy()
+            else:
+                boxes = np.zeros((0, 4))
+                confidences = np.zeros(0)
+                classes = np.zeros(0)
+            centers_x = (boxes[:, 0] + boxes[:, 2]) / 2
+            centers_y = (boxes[:, 1] + boxes[:, 3]) / 2
+            
+            detections = []
+            for seat in seat_positions:
+                seat_id = seat['seat_id']
+                x, y, w, h = seat['x'], seat['y'], seat['width'], seat['height']
+                inside = (centers_x >= x) & (centers_x < x + w) & (centers_y >= y) & (centers_y < y + h)
+                if w <= 0 or h <= 0 or not inside.any():
+                    detections.append(self.create_empty_detection(seat_id))
+                    continue
+                
+                candidates = np.flatnonzero(inside)
+                best_idx = candidates[np.argmax(confidences[candidates])]
+                confidence = float(confidences[best_idx])
+                box = boxes[best_idx]
+                
+                # Boxes are reported relative to the seat, as in seat_crop mode
+                detections.append({
+                    'seat_id': seat_id,
+                    'face_detected': True,
+                    'body_detected': True,
+                    'gesture_type': self.classify_gesture_from_class_id(int(classes[best_idx]), confidence),
+                    'confidence': confidence,
+                    'bbox': {
+                        'x': int(box[0] - x),
+                        'y': int(box[1] - y),
+                        'width': int(box[2] - box[0]),
+                        'height': int(box[3] - box[1])
+                    }
+                })
+            return detections
+        except Exception as e:
+            logger.warning(f"Full-frame inference failed, falling back to seat crops: {e}")
+            return None
+    
+    def real_detection(self, roi, seat_id):
+        """
+        Perform real YOLO detection on the ROI
+        """
+        try:
+            logger.debug(f"Running real detection for seat {seat_id}")
+            
+            # Run inference based on model type
+            if self.model_type == 'pytorch':
+                return self._pytorch_inference(roi, seat_id)
+            elif self.model_type == 'onnx':
+                return self._onnx_inference(roi, seat_id)
+            elif self.model_type == 'tensorflow':
+                return self._tensorflow_inference(roi, seat_id)
+            else:
+                return self.simulate_detection(roi, seat_id)
+                
+        except Exception as e:
+            logger.error(f"Error in real detection for seat {seat_id}: {str(e)}")
+            return self.simulate_detection(roi, seat_id)
+    
+    def _pytorch_inference(self, roi, seat_id):
+        """PyTorch model inference"""
+        try:
+            # Run inference
+            results = self.model(roi)
+            
+            # Process results based on model type
+            if hasattr(results, 'pandas'):
+                # YOLOv5 format
+                return self._process_yolov5_results(results, seat_id)
+            elif hasattr(results, 'boxes'):
+                # YOLOv8 format
+                return self._process_yolov8_results(results, seat_id)
+            else:
+                # Raw PyTorch model
+                return self._process_raw_pytorch_results(results, seat_id)
+                
+        except Exception as e:
+            logger.error(f"PyTorch inference error: {e}")
+            return self.simulate_detection(roi, seat_id)
+    
+    def _process_yolov5_results(self, results, seat_id):
+        """Process YOLOv5 results"""
+        detections = results.pandas().xyxy[0]
+        
+        if len(detections) > 0:
+            # Get highest confidence detection
+            best_detection = detections.loc[detections['confidence'].idxmax()]
+            confidence = float(best_detection['confidence'])
+            
+            # Determine detection type based on class
+            class_name = str(best_detection['name']).lower()
+            gesture_type = self.classify_gesture_from_class(class_name, confidence)
+            
+            bbox = {
+                'x': int(best_detection['xmin']),
+                'y': int(best_detection['ymin']),
+                'width': int(best_detection['xmax'] - best_detection['xmin']),
+                'height': int(best_detection['ymax'] - best_detection['ymin'])
+            }
+            
+            return {
+                'seat_id': seat_id,
+                'face_detected': 'face' in class_name or 'head' in class_name or 'person' in class_name,
+                'body_detected': True,
+                'gesture_type': gesture_type,
+                'confidence': confidence,
+                'bbox': bbox
+            }
+        
+        return self.create_empty_detection(seat_id)
+    
+    def _process_yolov8_results(self, results, seat_id):
+        """Process YOLOv8 results"""
+        if results.boxes is not None and len(results.boxes) > 0:
+            # Get highest confidence detection
+            confidences = results.boxes.conf.cpu().numpy()
+            best_idx = np.argmax(confidences)
+            confidence = float(confidences[best_idx])
+            
+            # Get class
+            classes = results.boxes.cls.cpu().numpy()
+            class_id = int(classes[best_idx])
+            
+            # Map class ID to gesture (this depends on your model's classes)
+            gesture_type = self.classify_gesture_from_class_id(class_id, confidence)
+            
+            # Get bbox
+            boxes = results.boxes.xyxy.cpu().numpy()
+            box = boxes[best_idx]
+            bbox = {
+                'x': int(box[0]),
+                'y': int(box[1]),
+                'width': int(box[2] - box[0]),
+                'height': int(box[3] - box[1])
+            }
+            
+            return {
+                'seat_id': seat_id,
+                'face_detected': True,
+                'body_detected': True,
+                'gesture_type': gesture_type,
+                'confidence': confidence,
+                'bbox': bbox
+            }
+        
+        return self.create_empty_detection(seat_id)
+    
+    def _onnx_inference(self, roi, seat_id):
+        """ONNX model inference"""
+        # Implement ONNX inference logic here
+        return self.simulate_detection(roi, seat_id)
+    
+    def _tensorflow_inference(self, roi, seat_id):
+        """TensorFlow model inference"""
+        # Implement TensorFlow inference logic here
+        return self.simulate_detection(roi, seat_id)
+    
+    def classify_gesture_from_class(self, class_name, confidence):
+        """Classify gesture based on class name"""
+        class_name = class_name.lower()
+        
+        if 'focused' in class_name or 'attention' in class_name:
+            return 'focused'
+        elif 'sleep' in class_name or 'drowsy' in class_name:
+            return 'sleeping'
+        elif 'phone' in class_name or 'mobile' in class_name:
+            return 'using_phone'
+        elif 'talk' in class_name or 'chat' in class_name:
+            return 'chatting'
+        elif 'write' in class_name or 'writing' in class_name:
+            return 'writing'
+        elif 'yawn' in class_name:
+            return 'yawning'
+        elif 'away' in class_name or 'distract' in class_name:
+            return 'looking_away'
+        elif 'face' in class_name or 'head' in class_name or 'person' in class_name:
+            # Default classification based on confidence
+            return self.classify_gesture_from_confidence(confidence)
+        else:
+            return 'unknown'
+    
+    def classify_gesture_from_class_id(self, class_id, confidence):
+        """Classify gesture based on class ID"""
+        # This mapping depends on your specific model
+        # Adjust according to your model's class definitions
+        gesture_map = {
+            0: 'focused',
+            1: 'looking_away',
+            2: 'sleeping',
+            3: 'using_phone',
+            4: 'chatting',
+            5: 'writing',
+            6: 'yawning'
+        }
+        
+        return gesture_map.get(class_id, self.classify_gesture_from_confidence(confidence))
+    
+    def classify_gesture_from_confidence(self, confidence):
+        """Classify gesture based on confidence level"""
+        if confidence > 0.8:
+            return 'focused'
+        elif confidence > 0.6:
+            gestures = ['focused', 'looking_away', 'writing']
+            return np.random.choice(gestures)
+        else:
+            return 'looking_away'
+    
+    def simulate_detection(self, roi, seat_id):
+        """
+        Simulate YOLO detection results for demonstration
+        """
+        import random
+        
+        # Simulate detection probabilities with realistic distribution
+        face_detected = random.random() > 0.25  # 75% chance of face detection
+        
+        if face_detected:
+            # Simulate gesture detection with realistic probabilities
+            gestures = ['focused', 'looking_away', 'sleeping', 'using_phone', 'chatting', 'writing', 'yawning']
+            # Focused is most likely, followed by looking_away
+            gesture_weights = [0.45, 0.25, 0.08, 0.08, 0.06, 0.06, 0.02]
+            gesture_type = random.choices(gestures, weights=gesture_weights)[0]
+            confidence = random.uniform(0.65, 0.95)
+        else:
+            gesture_type = 'absent'
+            confidence = 0.0
+        
+        return {
+            'seat_id': seat_id,
+            'face_detected': face_detected,
+            'body_detected': face_detected,
+            'gesture_type': gesture_type,
+            'confidence': confidence,
+            'bbox': {
+                'x': random.randint(0, 50),
+                'y': random.randint(0, 50),
+                'width': random.randint(30, 80),
+                'height': random.randint(40, 100)
+            } if face_detected else None
+        }
+    
+    def create_empty_detection(self, seat_id):
+        """Create empty detection result"""
+        return {
+            'seat_id': seat_id,
+            'face_detected': False,
+            'body_detected': False,
+            'gesture_type': 'absent',
+            'confidence': 0.0,
+            'bbox': None
+        }
+
+    def _load_custom_model(self):
+        """Load custom model format"""
+        try:
+            # Try to import and use any custom model loading logic
+            # This is a placeholder for custom model loading logic
+            logger.info("Attempting to load as custom model")
+            
+            # First try with torch (most common)
+            try:
+                self.model = torch.load(self.model_path, map_location='cpu')
+                logger.info("Loaded custom model with PyTorch")
+                self.model_type = 'pytorch_custom'
+                return
+            except Exception as e:
+                logger.warning(f"PyTorch custom loading failed: {e}")
+            
+            # Try with other frameworks or custom logic here
+            # ...
+            
+            # If all fails, use mock model
+            raise Exception("Custom model loading failed")
+            
+        except Exception as e:
+            logger.error(f"Custom model loading failed: {e}")
+            self._use_mock_model()
+
+
+def resolve_model_path(detection_model_type):
+    """Path of the uploaded .py model for a detection model type"""
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 
+                        'uploads', 'models', f'{detection_model_type}.py')
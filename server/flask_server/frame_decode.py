@@ -0,0 +1,136 @@
+"""
+ROI-aware reduced-resolution JPEG decoding.
+
+libjpeg can decode at 1/2, 1/4 or 1/8 scale directly in the DCT domain
+(OpenCV's IMREAD_REDUCED_COLOR_N), which is much cheaper than a full decode
+followed by a resize. For each session layout and frame resolution we pick
+the largest scale at which the smallest seat ROI still has enough pixels for
+the detector's input size, cache the decision, and rescale seat coordinates
+(and the returned bboxes) accordingly.
+"""
+import math
+import os
+import threading
+from collections import OrderedDict
+
+import cv2
+
+DEFAULT_INPUT_SIZE = 640
+
+# Minimum seat short side, as a fraction of the detector input size (96 px
+# for 640). The seat box frames a student's upper body, so the face spans
+# roughly a third of it: 96 px keeps faces around 32 px, where eyes, head
+# angle and a phone in hand are still resolvable. The crop is letterboxed up
+# to the input size either way; below this the upscale is mostly
+# interpolation. With the live monitoring grids this allows 1/2 decodes for
+# 3x3 and 4x4 at 1080p and 3x3 and 2x2 at 720p, and 1/4 for 2x2 at 1080p
+# (python benchmark.py decode).
+ROI_INPUT_FRACTION = float(os.environ.get('DECODE_ROI_INPUT_FRACTION', 0.15))
+
+REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8
+}
+
+
+def is_jpeg(data):
+    return len(data) > 2 and data[0] == 0xFF and data[1] == 0xD8
+
+
+def min_roi_pixels_for(input_size):
+    """Smallest seat ROI short side worth keeping for a detector input size"""
+    return max(1, int(input_size * ROI_INPUT_FRACTION))
+
+
+def choose_decode_scale(seat_positions, frame_shape, min_roi_pixels, full_frame_input=None):
+    """
+    Largest of 8/4/2 that keeps every valid seat ROI at least min_roi_pixels
+    on its short side. In full-frame mode the whole frame must also stay at
+    least full_frame_input pixels on its long side.
+    """
+    height, width = frame_shape[:2]
+    sides = [min(min(seat['width'], width - seat['x']), min(seat['height'], height - seat['y']))
+             for seat in seat_positions
+             if seat['x'] >= 0 and seat['y'] >= 0 and seat['width'] > 0 and seat['height'] > 0]
+    sides = [side for side in sides if side > 0]
+    if not sides:
+        return 1
+    smallest = min(sides)
+
+    for scale in (8, 4, 2):
+        if smallest / scale < min_roi_pixels:
+            continue
+        if full_frame_input and max(height, width) / scale < full_frame_input:
+            continue
+        return scale
+    return 1
+
+
+def scale_seats(seat_positions, scale):
+    """Seat positions in the coordinates of a frame decoded at 1/scale"""
+    if scale == 1:
+        return seat_positions
+    return [{**seat, 'x': seat['x'] / scale, 'y': seat['y'] / scale,
+             'width': seat['width'] / scale, 'height': seat['height'] / scale} for seat in seat_positions]
+
+
+def restore_bboxes(detections, scale):
+    """Map detection bboxes from a reduced frame back to full-resolution pixels"""
+    if scale == 1:
+        return detections
+    for detection in detections:
+        bbox = detection.get('bbox')
+        if bbox:
+            detection['bbox'] = {key: int(value * scale) for key, value in bbox.items()}
+    return detections
+
+
+def _layout_signature(seat_positions):
+    return tuple((seat['x'], seat['y'], seat['width'], seat['height']) for seat in seat_positions)
+
+
+class DecodePlanner:
+    """Caches the decode scale per session layout and frame resolution"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.plans = OrderedDict()
+        self.lock = threading.Lock()
+
+    def decode(self, data, seat_positions, session_id=None, input_size=DEFAULT_INPUT_SIZE, full_frame=False):
+        """
+        Decode encoded image bytes (numpy uint8 buffer) for a detector with the
+        given input size. Returns (frame, scale) where frame is 1/scale of the
+        native resolution. In full-frame mode the whole frame must also keep
+        at least input_size pixels on its long side.
+        """
+        if not seat_positions or not is_jpeg(data):
+            return cv2.imdecode(data, cv2.IMREAD_COLOR), 1
+
+        key = (session_id, input_size, full_frame, _layout_signature(seat_positions))
+        with self.lock:
+            plan = self.plans.get(key)
+            if plan is not None:
+                self.plans.move_to_end(key)
+
+        if plan is not None:
+            resolution, scale = plan
+            frame = cv2.imdecode(data, REDUCED_FLAGS[scale])
+            expected = (math.ceil(resolution[0] / scale), math.ceil(resolution[1] / scale))
+            if frame is not None and abs(frame.shape[0] - expected[0]) <= 1 and abs(frame.shape[1] - expected[1]) <= 1:
+                return frame, scale
+
+        # First frame for this layout, or the camera resolution changed: decode
+        # at full size once and plan the scale for the following frames
+        frame = cv2.imdecode(data, cv2.IMREAD_COLOR)
+        if frame is None:
+            return None, 1
+        scale = choose_decode_scale(seat_positions, frame.shape, min_roi_pixels_for(input_size),
+                                    input_size if full_frame else None)
+        with self.lock:
+            self.plans[key] = (frame.shape[:2], scale)
+            while len(self.plans) > self.max_entries:
+                self.plans.popitem(last=False)
+        return frame, 1
@@ -0,0 +1,26 @@
+"""
+Compact gesture code table shared by the time-series store, analytics and
+compact response encodings. Codes are stable; only append new gestures.
+"""
+
+GESTURE_TYPES = [
+    'absent',
+    'focused',
+    'looking_away',
+    'sleeping',
+    'using_phone',
+    'chatting',
+    'writing',
+    'yawning',
+    'unknown'
+]
+
+GESTURE_CODES = {gesture: code for code, gesture in enumerate(GESTURE_TYPES)}
+
+ABSENT = GESTURE_CODES['absent']
+FOCUSED = GESTURE_CODES['focused']
+UNKNOWN = GESTURE_CODES['unknown']
+
+
+def gesture_code(gesture_type):
+    return GESTURE_CODES.get(gesture_type, UNKNOWN)
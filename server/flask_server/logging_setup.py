@@ -0,0 +1,141 @@
+"""
+Non-blocking logging for the Flask server.
+
+Request threads only put records on an in-memory queue; a QueueListener
+thread does the file and console writes. Repeated messages from the same
+call site are rate limited, and per-frame details are folded into periodic
+hot-path summaries instead of being logged on every request.
+"""
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+import numpy as np
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+RATE_LIMIT_PER_INTERVAL = int(os.environ.get('LOG_RATE_LIMIT', 10))
+RATE_LIMIT_INTERVAL = float(os.environ.get('LOG_RATE_INTERVAL', 10))
+SUMMARY_INTERVAL = float(os.environ.get('LOG_SUMMARY_INTERVAL', 30))
+
+_listener = None
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Allow at most `limit` records per call site (file, line, level) every
+    `interval` seconds. The next record let through reports how many were
+    suppressed.
+    """
+
+    def __init__(self, limit=RATE_LIMIT_PER_INTERVAL, interval=RATE_LIMIT_INTERVAL):
+        super().__init__()
+        self.limit = limit
+        self.interval = interval
+        self.windows = {}
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        key = (record.pathname, record.lineno, record.levelno)
+        now = time.monotonic()
+        with self.lock:
+            window_start, count, suppressed = self.windows.get(key, (now, 0, 0))
+            if now - window_start >= self.interval:
+                window_start, count = now, 0
+            if count >= self.limit:
+                self.windows[key] = (window_start, count, suppressed + 1)
+                return False
+            self.windows[key] = (window_start, count + 1, 0)
+
+        if suppressed:
+            record.msg = f"{record.getMessage()} ({suppressed} similar messages suppressed)"
+            record.args = None
+        return True
+
+
+def configure_logging(log_file='flask_server.log', level=logging.INFO):
+    """
+    Route all logging through a queue drained by a background listener
+    writing to log_file and stdout.
+    """
+    global _listener
+
+    if _listener is not None:
+        return _listener
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    file_handler = logging.FileHandler(log_file)
+    file_handler.setFormatter(formatter)
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter())
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
+
+
+class HotPathSummary:
+    """
+    Collects per-frame stats and logs one structured summary every
+    `interval` seconds instead of a line per request.
+    """
+
+    def __init__(self, logger, interval=SUMMARY_INTERVAL, max_samples=4096):
+        self.logger = logger
+        self.interval = interval
+        self.max_samples = max_samples
+        self.lock = threading.Lock()
+        self._reset(time.monotonic())
+
+    def _reset(self, now):
+        self.window_start = now
+        self.frames = 0
+        self.seats = 0
+        self.failed_frames = 0
+        self.sessions = set()
+        self.latencies = []
+
+    def record(self, session_id, seats, latency_ms, failed=False):
+        now = time.monotonic()
+        with self.lock:
+            self.frames += 1
+            self.seats += seats
+            self.failed_frames += 1 if failed else 0
+            self.sessions.add(session_id)
+            if len(self.latencies) < self.max_samples:
+                self.latencies.append(latency_ms)
+            if now - self.window_start < self.interval:
+                return
+            summary = self._summary(now)
+            self._reset(now)
+        self.logger.info(f"Detection summary: {summary}")
+
+    def _summary(self, now):
+        latencies = np.asarray(self.latencies) if self.latencies else np.zeros(1)
+        elapsed = now - self.window_start
+        return {
+            'window_s': round(elapsed, 1),
+            'frames': self.frames,
+            'fps': round(self.frames / elapsed, 2) if elapsed > 0 else 0,
+            'seats': self.seats,
+            'sessions': len(self.sessions),
+            'failed_frames': self.failed_frames,
+            'latency_ms_mean': round(float(latencies.mean()), 2),
+            'latency_ms_p95': round(float(np.percentile(latencies, 95)), 2)
+        }
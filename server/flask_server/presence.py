@@ -0,0 +1,177 @@
+"""
+Hysteresis-based per-seat presence tracking.
+
+A seat only changes between 'absent' and 'present' after the new observation
+has held for a configurable number of consecutive frames and, optionally, a
+minimum duration. Single missed frames therefore never flip attendance, and
+callers only need to act on the returned state-change events.
+"""
+import os
+import threading
+
+from timeseries_store import timestamp_to_ms
+
+DEFAULT_CONFIG = {
+    'enter_frames': int(os.environ.get('PRESENCE_ENTER_FRAMES', 2)),
+    'exit_frames': int(os.environ.get('PRESENCE_EXIT_FRAMES', 5)),
+    'enter_seconds': float(os.environ.get('PRESENCE_ENTER_SECONDS', 0)),
+    'exit_seconds': float(os.environ.get('PRESENCE_EXIT_SECONDS', 10))
+}
+
+
+# Allowed range per setting; the *_frames settings are integers
+CONFIG_LIMITS = {
+    'enter_frames': (1, 1000),
+    'exit_frames': (1, 1000),
+    'enter_seconds': (0.0, 86400.0),
+    'exit_seconds': (0.0, 86400.0)
+}
+
+
+def parse_config(config):
+    """Validate a client-supplied presence config; raises ValueError"""
+    if not isinstance(config, dict):
+        raise ValueError(f"presence_config must be an object, got {config!r}")
+    unknown = sorted(set(config) - set(CONFIG_LIMITS))
+    if unknown:
+        raise ValueError(f"Unknown presence_config settings: {', '.join(unknown)}")
+
+    parsed = {}
+    for key, value in config.items():
+        low, high = CONFIG_LIMITS[key]
+        integer = key.endswith('_frames')
+        try:
+            number = float(value)
+            valid = not isinstance(value, bool) and low <= number <= high
+            if integer:
+                valid = valid and number == int(number)
+                number = int(number)
+        except (TypeError, ValueError, OverflowError):
+            valid = False
+        if not valid:
+            kind = 'an integer' if integer else 'a number'
+            raise ValueError(f"presence_config.{key} must be {kind} between {low} and {high}, got {value!r}")
+        parsed[key] = number
+    return parsed
+
+
+class SeatPresence:
+    def __init__(self, attendance_time=None, departure_time=None):
+        self.attendance_time = attendance_time
+        self.departure_time = departure_time
+        self.state = 'present' if attendance_time and not departure_time else 'absent'
+
+        # Run of consecutive observations disagreeing with the current state
+        self.pending_frames = 0
+        self.pending_since = None
+        self.pending_since_ms = None
+
+
+class SessionPresence:
+    def __init__(self, config=None):
+        self.config = {**DEFAULT_CONFIG, **(config or {})}
+        self.seats = {}
+        self.lock = threading.Lock()
+
+    def update(self, timestamp, seat_positions, detections, timestamp_ms=None):
+        """
+        Feed one frame of detections. Returns the state-change events and
+        annotates each detection with the seat's confirmed presence fields.
+        Pass timestamp_ms when the caller has already parsed timestamp.
+        """
+        if timestamp_ms is None:
+            timestamp_ms = timestamp_to_ms(timestamp)
+        events = []
+
+        with self.lock:
+            for seat, detection in zip(seat_positions, detections):
+                key = str(detection['seat_id'])
+                presence = self.seats.get(key)
+                if presence is None:
+                    # Seed from the caller's stored times so a server restart keeps attendance
+                    presence = SeatPresence(seat.get('attendance_time'), seat.get('departure_time'))
+                    self.seats[key] = presence
+
+                observed = 'present' if detection['face_detected'] else 'absent'
+                if detection.get('carried_forward'):
+                    # A carried-forward result repeats an earlier observation;
+                    # only fresh inference counts towards confirming a change
+                    pass
+                elif observed == presence.state:
+                    presence.pending_frames = 0
+                    presence.pending_since = None
+                    presence.pending_since_ms = None
+                else:
+                    if presence.pending_frames == 0:
+                        presence.pending_since = timestamp
+                        presence.pending_since_ms = timestamp_ms
+                    presence.pending_frames += 1
+
+                    if observed == 'present':
+                        frames, seconds = self.config['enter_frames'], self.config['enter_seconds']
+                    else:
+                        frames, seconds = self.config['exit_frames'], self.config['exit_seconds']
+                    held_seconds = (timestamp_ms - presence.pending_since_ms) / 1000
+
+                    if presence.pending_frames >= frames and held_seconds >= seconds:
+                        events.append(self._transition(presence, detection, observed))
+
+                detection['presence_state'] = presence.state
+                detection['attendance_time'] = presence.attendance_time
+                detection['departure_time'] = presence.departure_time
+
+        return events
+
+    def _transition(self, presence, detection, state):
+        # Transitions are dated from the first frame of the confirming run
+        changed_at = presence.pending_since
+        presence.state = state
+        presence.pending_frames = 0
+        presence.pending_since = None
+        presence.pending_since_ms = None
+
+        if state == 'present':
+            if not presence.attendance_time:
+                presence.attendance_time = changed_at
+            presence.departure_time = None
+            event = 'arrived'
+        else:
+            presence.departure_time = changed_at
+            event = 'departed'
+
+        return {
+            'seat_id': detection['seat_id'],
+            'event': event,
+            'timestamp': changed_at,
+            'attendance_time': presence.attendance_time,
+            'departure_time': presence.departure_time
+        }
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(session_id, config=None):
+    """Return the presence tracker for a session; a new config replaces its thresholds"""
+    with _sessions_lock:
+        session = _sessions.get(session_id)
+        if session is None:
+            session = SessionPresence(config)
+            _sessions[session_id] = session
+        elif config:
+            session.config.update(config)
+        return session
+
+
+def drop_session(session_id):
+    """Forget a session's presence trackers, including its per-camera '<session_id>:<camera_id>' streams"""
+    prefix = f'{session_id}:'
+    with _sessions_lock:
+        for key in [k for k in _sessions if k == session_id or (isinstance(k, str) and k.startswith(prefix))]:
+            del _sessions[key]
+
+
+def reset_all():
+    with _sessions_lock:
+        _sessions.clear()
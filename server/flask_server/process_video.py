@@ -0,0 +1,233 @@
+"""
+Headless, high-throughput processing of recorded lectures.
+
+Runs a video file through the same YOLODetector seat pipeline as
+/api/detect-frame, as fast as the hardware allows: the video is split into
+segments decoded in parallel threads, skipped frames are only grabbed (not
+decoded), seat ROIs are batched per forward pass and inference can be spread
+over the process worker pool.
+
+Usage:
+    python process_video.py lecture.mp4 --seats seats.json --stride 30 \\
+        --model model_1 --output lecture_detections.csv --workers 4
+
+Writes one CSV row per seat per processed frame (rows are grouped by decode
+segment, not globally time ordered) plus a kondusif/tidak kondusif rekap
+built from running counters.
+"""
+import argparse
+import csv
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+
+import cv2
+
+from report_aggregator import ReportAggregator, GESTURE_REKAP
+
+_DONE = object()
+
+
+def load_seat_layout(path, layout_size=None, video_size=None):
+    """
+    Load seat positions as sent to /api/detect-frame. If the layout was drawn
+    on a different resolution than the video, rescale it.
+    """
+    with open(path, 'r') as f:
+        seats = json.load(f)
+    if isinstance(seats, dict):
+        seats = seats.get('seat_positions', [])
+
+    if layout_size and video_size and tuple(layout_size) != tuple(video_size):
+        sx = video_size[0] / layout_size[0]
+        sy = video_size[1] / layout_size[1]
+        seats = [{**seat, 'x': seat['x'] * sx, 'y': seat['y'] * sy,
+                  'width': seat['width'] * sx, 'height': seat['height'] * sy} for seat in seats]
+    return seats
+
+
+def decode_segment(path, start, end, stride, frames_queue):
+    """Decode frames [start, end) of the video, keeping every stride-th frame"""
+    cap = cv2.VideoCapture(path)
+    try:
+        if start:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+        index = start
+        while end is None or index < end:
+            if index % stride == 0:
+                ok, frame = cap.read()
+                if not ok:
+                    break
+                frames_queue.put((index, frame))
+            elif not cap.grab():
+                break
+            index += 1
+    finally:
+        cap.release()
+        frames_queue.put(_DONE)
+
+
+def segment_ranges(total_frames, segments, stride):
+    """Split the frame range into stride-aligned segments"""
+    if total_frames <= 0 or segments <= 1:
+        return [(0, None)]
+    size = -(-total_frames // segments)
+    size = -(-size // stride) * stride
+    return [(start, min(start + size, total_frames)) for start in range(0, total_frames, size)]
+
+
+def process_video(args):
+    cap = cv2.VideoCapture(args.video)
+    if not cap.isOpened():
+        raise SystemExit(f"Cannot open video: {args.video}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    video_size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    cap.release()
+
+    if args.stride:
+        stride = args.stride
+    elif args.sample_fps:
+        stride = max(1, int(round(fps / args.sample_fps)))
+    else:
+        stride = 1
+    seat_positions = load_seat_layout(args.seats, args.layout_size, video_size)
+    started_at = datetime.fromisoformat(args.start_time) if args.start_time else datetime.now()
+
+    from detector import YOLODetector, resolve_model_path
+
+    model_path = resolve_model_path(args.model)
+    pool = None
+    if args.workers > 0:
+        from worker_pool import InferenceWorkerPool
+        pool = InferenceWorkerPool(model_path, num_workers=args.workers,
+                                   detector_kwargs={'confidence_threshold': args.confidence})
+        infer = pool.detect_in_seats
+        inference_threads = args.workers
+    else:
+        detector = YOLODetector(model_path=model_path, confidence_threshold=args.confidence)
+        if args.batch_size:
+            detector.apply_runtime_config({**detector.runtime_config, 'batch_size': args.batch_size})
+        infer = detector.detect_in_seats
+        inference_threads = 1
+
+    segments = segment_ranges(total_frames, args.decoders, stride)
+    frames_queue = queue.Queue(maxsize=args.queue_size)
+    decoders = [threading.Thread(target=decode_segment, args=(args.video, start, end, stride, frames_queue), daemon=True)
+                for start, end in segments]
+    for decoder in decoders:
+        decoder.start()
+
+    expected = -(-total_frames // stride) if total_frames > 0 else None
+    report = ReportAggregator(rekap=GESTURE_REKAP)
+    write_lock = threading.Lock()
+    processed = 0
+    wall_start = time.perf_counter()
+    last_progress = 0.0
+
+    def frames():
+        remaining = len(decoders)
+        while remaining:
+            item = frames_queue.get()
+            if item is _DONE:
+                remaining -= 1
+                continue
+            yield item
+
+    with open(args.output, 'w', newline='') as out:
+        writer = csv.writer(out)
+        writer.writerow(['frame', 'timestamp', 'seat_id', 'gesture_type', 'confidence',
+                         'face_detected', 'body_detected'])
+
+        def handle(item):
+            nonlocal processed, last_progress
+            index, frame = item
+            detections = infer(frame, seat_positions)
+            timestamp = started_at + timedelta(seconds=index / fps)
+            with write_lock:
+                for d in detections:
+                    writer.writerow([index, timestamp.isoformat(), d['seat_id'], d['gesture_type'],
+                                     round(float(d['confidence']), 3), int(d['face_detected']), int(d['body_detected'])])
+                    report.add(d['gesture_type'], d['confidence'], timestamp, seat=d['seat_id'])
+                processed += 1
+                now = time.perf_counter()
+                if now - last_progress >= 1.0:
+                    last_progress = now
+                    _print_progress(processed, expected, now - wall_start, stride, fps)
+
+        with ThreadPoolExecutor(max_workers=inference_threads) as executor:
+            # Bound in-flight frames so decoded frames never pile up in memory
+            in_flight = set()
+            for item in frames():
+                in_flight.add(executor.submit(handle, item))
+                if len(in_flight) >= inference_threads * 2:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+            for future in in_flight:
+                future.result()
+
+    if pool is not None:
+        pool.shutdown()
+
+    elapsed = time.perf_counter() - wall_start
+    _print_progress(processed, expected, elapsed, stride, fps)
+    sys.stderr.write('\n')
+
+    rekap_path = os.path.splitext(args.output)[0] + '_rekap.csv'
+    report.write_csv(rekap_path)
+    totals = report.totals()
+
+    print(f"\n✅ Deteksi per kursi disimpan ke: {args.output}")
+    print(f"✅ Rekap disimpan ke: {rekap_path}")
+    print(f"🎞  {processed} frames ({processed * stride / fps / 60:.1f} menit video) dalam {elapsed:.1f} s "
+          f"({processed / elapsed:.1f} FPS)")
+    print(f"📊 Dominasi Kelas: {totals['status_dominan']} "
+          f"({totals['persen_kondusif']:.1f}% vs {totals['persen_tidak_kondusif']:.1f}%)")
+
+
+def _print_progress(processed, expected, elapsed, stride, fps):
+    rate = processed / elapsed if elapsed > 0 else 0
+    video_seconds = processed * stride / fps
+    speed = video_seconds / elapsed if elapsed > 0 else 0
+    if expected:
+        eta = (expected - processed) / rate if rate > 0 else 0
+        progress = f"{processed}/{expected} frames ({processed / expected * 100:5.1f}%) ETA {eta:5.0f}s"
+    else:
+        progress = f"{processed} frames"
+    sys.stderr.write(f"\r{progress}  {rate:6.1f} FPS  {speed:5.1f}x realtime")
+    sys.stderr.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Process a recorded lecture with the seat detection pipeline')
+    parser.add_argument('video', help='Video file to process')
+    parser.add_argument('--seats', required=True, help='JSON file with the session seat_positions')
+    parser.add_argument('--layout-size', type=int, nargs=2, metavar=('WIDTH', 'HEIGHT'),
+                        help='Resolution the seat layout was drawn on, if different from the video')
+    parser.add_argument('--model', default='model_1', help='Detection model name (model_1, model_2)')
+    parser.add_argument('--confidence', type=float, default=0.5)
+    parser.add_argument('--output', default=None, help='Per-seat detections CSV (default: <video>_detections.csv)')
+    parser.add_argument('--stride', type=int, default=None, help='Process every Nth frame')
+    parser.add_argument('--sample-fps', type=float, default=None, help='Process this many frames per video second')
+    parser.add_argument('--decoders', type=int, default=min(4, os.cpu_count() or 1),
+                        help='Parallel decode threads (video segments)')
+    parser.add_argument('--workers', type=int, default=0, help='Inference worker processes (0 = in-process)')
+    parser.add_argument('--batch-size', type=int, default=None, help='Seat ROIs per forward pass (in-process only)')
+    parser.add_argument('--queue-size', type=int, default=64, help='Decoded frames buffered ahead of inference')
+    parser.add_argument('--start-time', default=None, help='ISO time the recording started, for timestamps')
+    args = parser.parse_args()
+
+    if args.output is None:
+        args.output = os.path.splitext(args.video)[0] + '_detections.csv'
+
+    process_video(args)
+
+
+if __name__ == '__main__':
+    main()
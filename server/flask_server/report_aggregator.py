@@ -0,0 +1,203 @@
+"""
+Streaming report aggregator for classroom detection sessions.
+
+Keeps running per-label, per-seat and per-minute counters so the kondusif /
+tidak kondusif rekap can be produced at any point without holding every
+detection in memory. Raw detections are spilled to a chunked columnar file
+(consecutive numpy arrays per chunk) that can be streamed back when needed.
+"""
+import csv
+import json
+import os
+from collections import defaultdict
+from datetime import datetime
+
+import numpy as np
+
+# Rekap rows per model: (row label, source detection label)
+MODEL_1_REKAP = {
+    'rows': [('TOTAL TIDUR', 'tidur'), ('TOTAL MAIN_HP', 'main_hp'), ('TOTAL NORMAL', 'normal')],
+    'kondusif': ['normal'],
+    'tidak_kondusif': ['tidur', 'main_hp']
+}
+
+MODEL_2_REKAP = {
+    'rows': [('TOTAL TIDUR', 'nguap'), ('TOTAL MAIN_HP', 'balik_badan'), ('TOTAL NORMAL', 'normal')],
+    'kondusif': ['normal'],
+    'tidak_kondusif': ['nguap', 'balik_badan']
+}
+
+# Rekap for the live detect-frame gesture types
+GESTURE_REKAP = {
+    'rows': [('TOTAL TIDUR', 'sleeping'), ('TOTAL MAIN_HP', 'using_phone'), ('TOTAL FOKUS', 'focused')],
+    'kondusif': ['focused', 'writing'],
+    'tidak_kondusif': ['sleeping', 'using_phone', 'chatting', 'looking_away', 'yawning']
+}
+
+SPILL_COLUMNS = ['timestamp_ms', 'label_code', 'confidence', 'seat']
+
+
+class ReportAggregator:
+    def __init__(self, rekap=None, spill_path=None, chunk_size=4096):
+        self.rekap = rekap or MODEL_1_REKAP
+        self.spill_path = spill_path
+        self.chunk_size = chunk_size
+
+        self.total = 0
+        self.label_counts = defaultdict(int)
+        self.confidence_sums = defaultdict(float)
+        self.seat_counts = defaultdict(lambda: defaultdict(int))
+        self.minute_counts = defaultdict(lambda: defaultdict(int))
+        self.started_at = None
+        self.last_at = None
+
+        # Label code table for the spill file
+        self.label_codes = {}
+
+        self._buffer = {name: [] for name in SPILL_COLUMNS}
+        self._spill_file = open(spill_path, 'wb') if spill_path else None
+
+    def _label_code(self, label):
+        if label not in self.label_codes:
+            self.label_codes[label] = len(self.label_codes)
+        return self.label_codes[label]
+
+    def add(self, label, confidence, timestamp=None, seat=None):
+        """Record one detection"""
+        timestamp = timestamp or datetime.now()
+        if self.started_at is None:
+            self.started_at = timestamp
+        self.last_at = timestamp
+
+        self.total += 1
+        self.label_counts[label] += 1
+        self.confidence_sums[label] += float(confidence)
+        self.minute_counts[timestamp.strftime('%Y-%m-%d %H:%M')][label] += 1
+        if seat is not None:
+            self.seat_counts[seat][label] += 1
+
+        if self._spill_file is not None:
+            self._buffer['timestamp_ms'].append(int(timestamp.timestamp() * 1000))
+            self._buffer['label_code'].append(self._label_code(label))
+            self._buffer['confidence'].append(confidence)
+            self._buffer['seat'].append(-1 if seat is None else int(seat))
+            if len(self._buffer['label_code']) >= self.chunk_size:
+                self.flush()
+
+    def flush(self):
+        """Write buffered raw detections as one columnar chunk"""
+        if self._spill_file is None or not self._buffer['label_code']:
+            return
+        np.save(self._spill_file, np.asarray(self._buffer['timestamp_ms'], dtype=np.int64))
+        np.save(self._spill_file, np.asarray(self._buffer['label_code'], dtype=np.uint16))
+        np.save(self._spill_file, np.asarray(self._buffer['confidence'], dtype=np.float32))
+        np.save(self._spill_file, np.asarray(self._buffer['seat'], dtype=np.int32))
+        self._spill_file.flush()
+        for column in self._buffer.values():
+            column.clear()
+
+    def close(self):
+        """Flush remaining detections and write the label table next to the spill file"""
+        if self._spill_file is None:
+            return
+        self.flush()
+        self._spill_file.close()
+        self._spill_file = None
+        with open(self.spill_path + '.labels.json', 'w') as f:
+            json.dump(self.label_codes, f)
+
+    def totals(self):
+        """Kondusif / tidak kondusif totals computed from the counters"""
+        total_kondusif = sum(self.label_counts[label] for label in self.rekap['kondusif'])
+        total_tidak_kondusif = sum(self.label_counts[label] for label in self.rekap['tidak_kondusif'])
+        total_semua = total_kondusif + total_tidak_kondusif
+
+        persen_kondusif = (total_kondusif / total_semua * 100) if total_semua > 0 else 0
+        persen_tidak_kondusif = 100 - persen_kondusif
+
+        return {
+            'total_kondusif': total_kondusif,
+            'total_tidak_kondusif': total_tidak_kondusif,
+            'persen_kondusif': persen_kondusif,
+            'persen_tidak_kondusif': persen_tidak_kondusif,
+            'status_dominan': "Kondusif" if persen_kondusif >= persen_tidak_kondusif else "Tidak Kondusif"
+        }
+
+    def rekap_rows(self):
+        """Rekap rows in the same layout the original Excel report appended"""
+        totals = self.totals()
+        rows = [{'timestamp': '', 'label': name, 'confidence': self.label_counts[source]}
+                for name, source in self.rekap['rows']]
+        rows += [
+            {'timestamp': '', 'label': 'TOTAL KONDISIF', 'confidence': totals['total_kondusif']},
+            {'timestamp': '', 'label': 'TOTAL TIDAK KONDISIF', 'confidence': totals['total_tidak_kondusif']},
+            {'timestamp': '', 'label': 'PERSEN KONDISIF (%)', 'confidence': round(totals['persen_kondusif'], 2)},
+            {'timestamp': '', 'label': 'PERSEN TIDAK KONDISIF (%)', 'confidence': round(totals['persen_tidak_kondusif'], 2)},
+            {'timestamp': '', 'label': 'STATUS DOMINAN', 'confidence': totals['status_dominan']}
+        ]
+        return rows
+
+    def minute_rows(self):
+        labels = sorted(self.label_counts)
+        return [{'minute': minute, **{label: counts.get(label, 0) for label in labels}}
+                for minute, counts in sorted(self.minute_counts.items())]
+
+    def seat_rows(self):
+        labels = sorted(self.label_counts)
+        return [{'seat': seat, **{label: counts.get(label, 0) for label in labels}}
+                for seat, counts in sorted(self.seat_counts.items())]
+
+    def summary(self):
+        return {
+            'total_detections': self.total,
+            'label_counts': dict(self.label_counts),
+            'mean_confidence': {label: self.confidence_sums[label] / count
+                                for label, count in self.label_counts.items() if count},
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'last_at': self.last_at.isoformat() if self.last_at else None,
+            **self.totals()
+        }
+
+    def write_csv(self, path):
+        """Write the rekap rows as CSV"""
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['timestamp', 'label', 'confidence'])
+            writer.writeheader()
+            writer.writerows(self.rekap_rows())
+
+    def write_excel(self, path):
+        """Write Rekap, Per Menit and Per Kursi sheets built from the counters"""
+        import pandas as pd
+
+        with pd.ExcelWriter(path) as writer:
+            pd.DataFrame(self.rekap_rows()).to_excel(writer, sheet_name='Rekap', index=False)
+            pd.DataFrame(self.minute_rows()).to_excel(writer, sheet_name='Per Menit', index=False)
+            if self.seat_counts:
+                pd.DataFrame(self.seat_rows()).to_excel(writer, sheet_name='Per Kursi', index=False)
+
+
+def iter_spill_chunks(spill_path):
+    """Yield one dict of column arrays per chunk from a spill file"""
+    with open(spill_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        while f.tell() < size:
+            yield {name: np.load(f) for name in SPILL_COLUMNS}
+
+
+def export_spill_csv(spill_path, csv_path):
+    """Stream a spill file to CSV one chunk at a time"""
+    with open(spill_path + '.labels.json', 'r') as f:
+        labels = {code: label for label, code in json.load(f).items()}
+
+    with open(csv_path, 'w', newline='') as out:
+        writer = csv.writer(out)
+        writer.writerow(['timestamp', 'label', 'confidence', 'seat'])
+        for chunk in iter_spill_chunks(spill_path):
+            for ts, code, conf, seat in zip(chunk['timestamp_ms'], chunk['label_code'],
+                                            chunk['confidence'], chunk['seat']):
+                writer.writerow([
+                    datetime.fromtimestamp(ts / 1000).strftime('%Y-%m-%d %H:%M:%S'),
+                    labels[int(code)],
+                    round(float(conf), 2),
+                    '' if seat < 0 else int(seat)
+                ])
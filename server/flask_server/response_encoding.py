@@ -0,0 +1,81 @@
+"""
+Compact encodings for detect-frame results.
+
+Clients opt in through the Accept header:
+    application/json                      verbose per-seat dicts (default)
+    application/vnd.fokus.columnar+json   parallel arrays per field
+    application/x-msgpack                 the columnar layout as MessagePack,
+                                          with bboxes packed as little-endian int16
+"""
+import json
+
+import numpy as np
+
+from gestures import GESTURE_TYPES, gesture_code
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON_MIMETYPE = 'application/json'
+COLUMNAR_MIMETYPE = 'application/vnd.fokus.columnar+json'
+MSGPACK_MIMETYPE = 'application/x-msgpack'
+
+PRESENCE_STATES = ['absent', 'present']
+
+
+def supported_mimetypes():
+    mimetypes = [JSON_MIMETYPE, COLUMNAR_MIMETYPE]
+    if msgpack is not None:
+        mimetypes.append(MSGPACK_MIMETYPE)
+    return mimetypes
+
+
+def columnar_detections(detections, pack_bboxes=False):
+    """
+    Convert per-seat detection dicts to parallel arrays. Missing bboxes are
+    encoded as -1. Attendance times are sent sparsely as seat index -> time.
+    """
+    n = len(detections)
+    bboxes = np.full((n, 4), -1, dtype=np.int16)
+    for i, d in enumerate(detections):
+        bbox = d.get('bbox')
+        if bbox:
+            bboxes[i] = (bbox['x'], bbox['y'], bbox['width'], bbox['height'])
+
+    columns = {
+        'seat_id': [d['seat_id'] for d in detections],
+        'gesture': [gesture_code(d['gesture_type']) for d in detections],
+        'confidence': [round(float(d['confidence']), 3) for d in detections],
+        'face': [1 if d['face_detected'] else 0 for d in detections],
+        'body': [1 if d['body_detected'] else 0 for d in detections],
+        'carried': [1 if d.get('carried_forward') else 0 for d in detections],
+        'presence': [PRESENCE_STATES.index(d['presence_state']) if d.get('presence_state') in PRESENCE_STATES else 0
+                     for d in detections],
+        'bbox': bboxes.astype('<i2').tobytes() if pack_bboxes else bboxes.ravel().tolist(),
+        'attendance_time': {i: d['attendance_time'] for i, d in enumerate(detections) if d.get('attendance_time')},
+        'departure_time': {i: d['departure_time'] for i, d in enumerate(detections) if d.get('departure_time')}
+    }
+    return columns
+
+
+def encode_columnar(payload, pack_bboxes=False):
+    encoded = {key: value for key, value in payload.items() if key != 'detections'}
+    encoded['gesture_table'] = GESTURE_TYPES
+    encoded['presence_table'] = PRESENCE_STATES
+    encoded['detections'] = columnar_detections(payload.get('detections', []), pack_bboxes)
+    return encoded
+
+
+def encode(payload, mimetype):
+    """Serialize a detect-frame payload; returns (body, mimetype)"""
+    if mimetype == MSGPACK_MIMETYPE and msgpack is not None:
+        encoded = encode_columnar(payload, pack_bboxes=True)
+        # msgpack only accepts string keys in strict mode
+        for field in ('attendance_time', 'departure_time'):
+            encoded['detections'][field] = {str(k): v for k, v in encoded['detections'][field].items()}
+        return msgpack.packb(encoded, use_bin_type=True), MSGPACK_MIMETYPE
+    if mimetype == COLUMNAR_MIMETYPE:
+        return json.dumps(encode_columnar(payload), separators=(',', ':')), COLUMNAR_MIMETYPE
+    return json.dumps(payload), JSON_MIMETYPE
@@ -0,0 +1,179 @@
+"""
+Adaptive per-seat inference cadence.
+
+Seats whose gesture has been stable with good confidence are re-checked
+every Nth frame (N doubling up to max_interval); any change drops a seat
+back to every frame. Seats not re-checked get their last result carried
+forward and marked as such. An optional per-frame seat budget bounds the
+work for very large rooms: unstable and most overdue seats go first.
+"""
+import os
+import threading
+from collections import deque
+
+DEFAULT_CONFIG = {
+    'max_interval': int(os.environ.get('SEAT_CADENCE_MAX_INTERVAL', 4)),
+    'seat_budget': int(os.environ.get('SEAT_CADENCE_BUDGET', 0)),
+    'stability_window': int(os.environ.get('SEAT_CADENCE_WINDOW', 5)),
+    'min_confidence': float(os.environ.get('SEAT_CADENCE_MIN_CONFIDENCE', 0.7))
+}
+
+
+# Allowed range per setting; integers except min_confidence
+CONFIG_LIMITS = {
+    'max_interval': (1, 64),
+    'seat_budget': (0, 100000),
+    'stability_window': (1, 1000),
+    'min_confidence': (0.0, 1.0)
+}
+
+
+def parse_config(config):
+    """Validate a client-supplied cadence config; raises ValueError"""
+    if not isinstance(config, dict):
+        raise ValueError(f"cadence must be an object, got {config!r}")
+    unknown = sorted(set(config) - set(CONFIG_LIMITS))
+    if unknown:
+        raise ValueError(f"Unknown cadence settings: {', '.join(unknown)}")
+
+    parsed = {}
+    for key, value in config.items():
+        low, high = CONFIG_LIMITS[key]
+        try:
+            number = float(value)
+            valid = not isinstance(value, bool) and low <= number <= high
+            if key != 'min_confidence':
+                valid = valid and number == int(number)
+                number = int(number)
+        except (TypeError, ValueError, OverflowError):
+            valid = False
+        if not valid:
+            kind = 'a number' if key == 'min_confidence' else 'an integer'
+            raise ValueError(f"cadence.{key} must be {kind} between {low} and {high}, got {value!r}")
+        parsed[key] = number
+    return parsed
+
+
+class SeatState:
+    def __init__(self, stability_window):
+        self.history = deque(maxlen=stability_window)
+        self.last = None
+        self.interval = 1
+        self.frames_since_check = 0
+
+    def stable(self, min_confidence):
+        return (self.last is not None
+                and len(self.history) == self.history.maxlen
+                and len(set(self.history)) == 1
+                and (self.last['gesture_type'] == 'absent' or self.last['confidence'] >= min_confidence))
+
+
+class SessionCadence:
+    def __init__(self, config=None):
+        self.config = {**DEFAULT_CONFIG, **(config or {})}
+        self.seats = {}
+        self.lock = threading.Lock()
+
+    def _state(self, seat_id):
+        key = str(seat_id)
+        state = self.seats.get(key)
+        if state is None:
+            state = SeatState(self.config['stability_window'])
+            self.seats[key] = state
+        return state
+
+    def plan(self, seat_positions):
+        """Return the indices of seats to run inference on this frame"""
+        with self.lock:
+            candidates = []
+            for index, seat in enumerate(seat_positions):
+                state = self._state(seat['seat_id'])
+                state.frames_since_check += 1
+                if state.last is None or state.frames_since_check >= state.interval:
+                    # Unstable seats first, then the most overdue
+                    candidates.append((state.interval > 1, -state.frames_since_check / state.interval, index))
+
+            budget = self.config['seat_budget']
+            if budget and len(candidates) > budget:
+                candidates.sort()
+                # Seats never seen before must always run
+                never_seen = [c for c in candidates if self._state(seat_positions[c[2]]['seat_id']).last is None]
+                seen = [c for c in candidates if c not in never_seen]
+                candidates = never_seen + seen[:max(0, budget - len(never_seen))]
+
+            return sorted(index for _, _, index in candidates)
+
+    def update(self, seat_id, detection):
+        with self.lock:
+            state = self._state(seat_id)
+            changed = state.last is not None and state.last['gesture_type'] != detection['gesture_type']
+            state.last = detection
+            state.history.append(detection['gesture_type'])
+            state.frames_since_check = 0
+
+            if changed or not state.stable(self.config['min_confidence']):
+                state.interval = 1
+            else:
+                state.interval = min(state.interval * 2, self.config['max_interval'])
+
+    def carried(self, seat_id):
+        with self.lock:
+            state = self._state(seat_id)
+            return {
+                **state.last,
+                'carried_forward': True,
+                'frames_since_check': state.frames_since_check,
+                'check_interval': state.interval
+            }
+
+
+def run_with_cadence(cadence, seat_positions, infer):
+    """
+    Run infer(subset_of_seats) only for the seats due this frame and merge in
+    carried-forward results for the rest, preserving seat order.
+    """
+    due = cadence.plan(seat_positions)
+    due_set = set(due)
+    fresh = infer([seat_positions[i] for i in due]) if due else []
+
+    detections = []
+    fresh_iter = iter(fresh)
+    for index, seat in enumerate(seat_positions):
+        if index in due_set:
+            detection = next(fresh_iter)
+            # Keep our own copy; callers annotate the returned dicts
+            cadence.update(seat['seat_id'], dict(detection))
+            detection['carried_forward'] = False
+        else:
+            detection = cadence.carried(seat['seat_id'])
+        detections.append(detection)
+    return detections
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(session_id, config=None):
+    """Return the cadence scheduler for a session; a new config replaces its settings"""
+    with _sessions_lock:
+        session = _sessions.get(session_id)
+        if session is None:
+            session = SessionCadence(config)
+            _sessions[session_id] = session
+        elif config:
+            session.config.update(config)
+        return session
+
+
+def drop_session(session_id):
+    """Forget a session's cadence state, including its per-camera '<session_id>:<camera_id>' streams"""
+    prefix = f'{session_id}:'
+    with _sessions_lock:
+        for key in [k for k in _sessions if k == session_id or (isinstance(k, str) and k.startswith(prefix))]:
+            del _sessions[key]
+
+
+def reset_all():
+    with _sessions_lock:
+        _sessions.clear()
@@ -0,0 +1,174 @@
+"""
+Rolling-window session analytics.
+
+Each session keeps a fixed-size ring buffer of gesture codes per seat plus
+running per-seat gesture counts for the window. Pushing a frame subtracts the
+outgoing row and adds the incoming one with bincount, so the cost per frame
+depends on the seat count only, never on the window length. Carried-forward
+results (seats skipped by the inference cadence) are kept in the ring but
+flagged, and neither counts nor streaks treat them as new observations.
+"""
+import os
+import threading
+
+import numpy as np
+
+from gestures import GESTURE_TYPES, ABSENT, FOCUSED, gesture_code
+from timeseries_store import timestamp_to_ms
+
+DEFAULT_WINDOW_FRAMES = int(os.environ.get('ANALYTICS_WINDOW_FRAMES', 300))
+MAX_WINDOW_FRAMES = int(os.environ.get('ANALYTICS_MAX_WINDOW_FRAMES', 36000))
+
+# Gestures that count towards a distraction streak
+DISTRACTED = np.zeros(len(GESTURE_TYPES), dtype=bool)
+for _gesture in ('looking_away', 'sleeping', 'using_phone', 'chatting', 'yawning'):
+    DISTRACTED[GESTURE_TYPES.index(_gesture)] = True
+
+
+class SessionWindow:
+    def __init__(self, window_frames=DEFAULT_WINDOW_FRAMES):
+        self.window_frames = window_frames
+        self.num_gestures = len(GESTURE_TYPES)
+        self.lock = threading.Lock()
+
+        self.seat_ids = []
+        self.seat_index = {}
+
+        self.codes = np.full((window_frames, 0), ABSENT, dtype=np.uint8)
+        self.observed = np.ones((window_frames, 0), dtype=bool)
+        self.timestamps = np.zeros(window_frames, dtype=np.int64)
+        self.counts = np.zeros((0, self.num_gestures), dtype=np.int64)
+        self.last_code = np.zeros(0, dtype=np.uint8)
+        self.streak = np.zeros(0, dtype=np.int64)
+        self.distraction_streak = np.zeros(0, dtype=np.int64)
+
+        self.head = 0
+        self.filled = 0
+
+    def _add_seats(self, seat_ids):
+        new = [seat_id for seat_id in seat_ids if str(seat_id) not in self.seat_index]
+        if not new:
+            return
+        for seat_id in new:
+            self.seat_index[str(seat_id)] = len(self.seat_ids)
+            self.seat_ids.append(seat_id)
+
+        n = len(new)
+        self.codes = np.hstack([self.codes, np.full((self.window_frames, n), ABSENT, dtype=np.uint8)])
+        self.observed = np.hstack([self.observed, np.ones((self.window_frames, n), dtype=bool)])
+        new_counts = np.zeros((n, self.num_gestures), dtype=np.int64)
+        # History before the seat appeared counts as absent
+        new_counts[:, ABSENT] = self.filled
+        self.counts = np.vstack([self.counts, new_counts])
+        self.last_code = np.concatenate([self.last_code, np.full(n, ABSENT, dtype=np.uint8)])
+        self.streak = np.concatenate([self.streak, np.zeros(n, dtype=np.int64)])
+        self.distraction_streak = np.concatenate([self.distraction_streak, np.zeros(n, dtype=np.int64)])
+
+    def _row_counts(self, row, observed):
+        num_seats = len(self.seat_ids)
+        flat = (np.arange(num_seats, dtype=np.int64) * self.num_gestures + row)[observed]
+        return np.bincount(flat, minlength=num_seats * self.num_gestures).reshape(num_seats, self.num_gestures)
+
+    def push(self, timestamp, detections):
+        """Add one frame of detections and return the windowed statistics"""
+        with self.lock:
+            self._add_seats([d['seat_id'] for d in detections])
+
+            row = np.full(len(self.seat_ids), ABSENT, dtype=np.uint8)
+            observed = np.ones(len(self.seat_ids), dtype=bool)
+            for d in detections:
+                index = self.seat_index[str(d['seat_id'])]
+                row[index] = gesture_code(d['gesture_type'])
+                observed[index] = not d.get('carried_forward')
+
+            if self.filled == self.window_frames:
+                self.counts -= self._row_counts(self.codes[self.head], self.observed[self.head])
+            else:
+                self.filled += 1
+            self.counts += self._row_counts(row, observed)
+            self.codes[self.head] = row
+            self.observed[self.head] = observed
+            self.timestamps[self.head] = timestamp_to_ms(timestamp)
+            self.head = (self.head + 1) % self.window_frames
+
+            # Streaks only advance on fresh observations
+            same = row == self.last_code
+            self.streak = np.where(observed, np.where(same, self.streak + 1, 1), self.streak)
+            self.distraction_streak = np.where(
+                observed, np.where(DISTRACTED[row], self.distraction_streak + 1, 0), self.distraction_streak
+            )
+            self.last_code = np.where(observed, row, self.last_code)
+
+            return self._stats()
+
+    def _stats(self):
+        num_seats = len(self.seat_ids)
+        oldest = self.timestamps[self.head % self.window_frames] if self.filled == self.window_frames else self.timestamps[0]
+        newest = self.timestamps[(self.head - 1) % self.window_frames]
+        observations = self.counts.sum(axis=1)
+        samples = int(observations.sum())
+        dominant = np.argmax(self.counts, axis=1) if num_seats else np.zeros(0, dtype=np.int64)
+        focus = np.divide(self.counts[:, FOCUSED] * 100, observations,
+                          out=np.zeros(num_seats), where=observations > 0)
+
+        return {
+            'window_frames': int(self.filled),
+            'window_seconds': float(max(0, newest - oldest) / 1000),
+            'focus_percentage': float(self.counts[:, FOCUSED].sum() / samples * 100) if samples else 0,
+            'seats': [
+                {
+                    'seat_id': seat_id,
+                    'dominant_gesture': GESTURE_TYPES[int(dominant[i])],
+                    'focus_percentage': float(focus[i]),
+                    'current_streak': {
+                        'gesture_type': GESTURE_TYPES[int(self.last_code[i])],
+                        'frames': int(self.streak[i])
+                    },
+                    'distraction_streak': int(self.distraction_streak[i])
+                }
+                for i, seat_id in enumerate(self.seat_ids)
+            ]
+        }
+
+
+_windows = {}
+_windows_lock = threading.Lock()
+
+
+def parse_window_frames(value):
+    """Validate a client-supplied window length; raises ValueError"""
+    try:
+        frames = int(value)
+        valid = not isinstance(value, bool) and frames == float(value) and 0 < frames <= MAX_WINDOW_FRAMES
+    except (TypeError, ValueError):
+        valid = False
+    if not valid:
+        raise ValueError(f"analytics_window must be an integer between 1 and {MAX_WINDOW_FRAMES}, got {value!r}")
+    return frames
+
+
+def get_window(session_id, window_frames=None):
+    """
+    Return the rolling window for a session, creating it on first use.
+    window_frames only sizes a new window; an existing window keeps its
+    history until reset_all().
+    """
+    with _windows_lock:
+        window = _windows.get(session_id)
+        if window is None:
+            window = SessionWindow(window_frames or DEFAULT_WINDOW_FRAMES)
+            _windows[session_id] = window
+        return window
+
+
+def drop_session(session_id):
+    """Forget a session's rolling windows, including its per-camera '<session_id>:<camera_id>' streams"""
+    prefix = f'{session_id}:'
+    with _windows_lock:
+        for key in [k for k in _windows if k == session_id or (isinstance(k, str) and k.startswith(prefix))]:
+            del _windows[key]
+
+
+def reset_all():
+    with _windows_lock:
+        _windows.clear()
@@ -0,0 +1,289 @@
+"""
+Fair multi-camera stream scheduler.
+
+One inference process owns many camera sources. Each camera only keeps its
+newest frame; a scheduler thread repeatedly picks the cameras to serve next
+and runs their frames through one shared detect_in_frames call, so seat ROIs
+from different cameras share batched forward passes.
+
+Cameras that have gone longer than 1/min_rate seconds without a result are
+served first; the rest are ordered by seat count (weight) x staleness. Each
+round is capped at a seat budget so a single huge room cannot starve others.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_RATE = 0.2
+DEFAULT_ROUND_SEATS = 256
+METRICS_WINDOW = 60.0
+
+
+def _positive_number(name, value):
+    try:
+        number = float(value)
+        valid = not isinstance(value, bool) and 0 < number < float('inf')
+    except (TypeError, ValueError):
+        valid = False
+    if not valid:
+        raise ValueError(f"{name} must be a positive number, got {value!r}")
+    return number
+
+
+def parse_camera_settings(weight=None, min_rate=DEFAULT_MIN_RATE):
+    """Validate client-supplied scheduling settings; raises ValueError"""
+    return (_positive_number('weight', weight) if weight is not None else None,
+            _positive_number('min_rate', min_rate))
+
+
+class CameraSource:
+    def __init__(self, camera_id, session_id, seat_positions, weight=None, min_rate=DEFAULT_MIN_RATE,
+                 source=None, options=None):
+        self.camera_id = camera_id
+        self.session_id = session_id
+        self.seat_positions = seat_positions
+        self.weight = weight or max(1, len(seat_positions))
+        self.min_rate = min_rate
+        self.source = source
+        self.options = options or {}
+
+        self.frame = None
+        self.frame_timestamp = None
+        self.frame_received_at = None
+        self.frame_seq = 0
+        self.dropped_frames = 0
+
+        self.result = None
+        self.result_seq = 0
+        self.result_frame_seq = 0
+        self.error = None
+        self.registered_at = time.monotonic()
+        self.result_at = None
+        self.result_times = deque()
+        self.lags_ms = deque(maxlen=256)
+
+        self.reader = None
+        self.stopped = False
+
+    def staleness(self, now):
+        return now - (self.result_at or self.registered_at)
+
+    def metrics(self, now):
+        while self.result_times and now - self.result_times[0] > METRICS_WINDOW:
+            self.result_times.popleft()
+        window = min(METRICS_WINDOW, now - self.registered_at) or 1.0
+        lags = np.asarray(self.lags_ms) if self.lags_ms else None
+        rate = len(self.result_times) / window
+        return {
+            'camera_id': self.camera_id,
+            'session_id': self.session_id,
+            'seats': len(self.seat_positions),
+            'weight': self.weight,
+            'min_rate': self.min_rate,
+            'results_per_s': round(rate, 3),
+            'meeting_min_rate': rate >= self.min_rate or now - self.registered_at < 1 / self.min_rate,
+            'staleness_s': round(self.staleness(now), 3),
+            'lag_ms_mean': round(float(lags.mean()), 1) if lags is not None else None,
+            'lag_ms_p95': round(float(np.percentile(lags, 95)), 1) if lags is not None else None,
+            'frames_pending': self.frame_seq > self.result_seq,
+            'dropped_frames': self.dropped_frames,
+            'last_error': self.error,
+            'source': self.source
+        }
+
+
+class StreamScheduler:
+    def __init__(self, get_detector, on_result, round_seats=DEFAULT_ROUND_SEATS):
+        self.get_detector = get_detector
+        self.on_result = on_result
+        self.round_seats = round_seats
+
+        self.cameras = {}
+        self.condition = threading.Condition()
+        self.thread = None
+        self.running = False
+
+    def start(self):
+        with self.condition:
+            if self.running:
+                return
+            self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        logger.info("Camera stream scheduler started")
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        for camera_id in list(self.cameras):
+            self.remove_camera(camera_id)
+
+    def add_camera(self, camera_id, session_id, seat_positions, **kwargs):
+        camera = CameraSource(camera_id, session_id, seat_positions, **kwargs)
+        with self.condition:
+            previous = self.cameras.get(camera_id)
+            if previous is not None:
+                previous.stopped = True
+            self.cameras[camera_id] = camera
+        if camera.source:
+            camera.reader = threading.Thread(target=self._read_source, args=(camera,), daemon=True)
+            camera.reader.start()
+        self.start()
+        logger.info(f"Camera {camera_id} registered for session {session_id} with {len(seat_positions)} seats")
+        return camera
+
+    def remove_camera(self, camera_id):
+        with self.condition:
+            camera = self.cameras.pop(camera_id, None)
+            if camera is not None:
+                camera.stopped = True
+                self.condition.notify_all()
+        return camera is not None
+
+    def submit_frame(self, camera_id, frame, timestamp):
+        """Replace the camera's pending frame with a newer one; returns its sequence number"""
+        with self.condition:
+            camera = self.cameras[camera_id]
+            if camera.frame_seq > camera.result_seq:
+                camera.dropped_frames += 1
+            camera.frame = frame
+            camera.frame_timestamp = timestamp
+            camera.frame_received_at = time.monotonic()
+            camera.frame_seq += 1
+            self.condition.notify_all()
+            return camera.frame_seq
+
+    def wait_result(self, camera_id, seq, timeout):
+        """
+        Block until frame seq or a later one has been processed. Returns
+        (result, error); result is None unless it came from frame seq or later,
+        and error is set when that processing failed.
+        """
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while True:
+                camera = self.cameras.get(camera_id)
+                if camera is None:
+                    return None, None
+                if camera.result_seq >= seq:
+                    result = camera.result if camera.result_frame_seq >= seq else None
+                    error = camera.error if camera.error and camera.error['frame_seq'] >= seq else None
+                    return result, error
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None, None
+                self.condition.wait(remaining)
+
+    def latest_result(self, camera_id):
+        camera = self.cameras.get(camera_id)
+        return camera.result if camera else None
+
+    def latest_error(self, camera_id):
+        """The failure of the camera's most recent frame, if it failed"""
+        camera = self.cameras.get(camera_id)
+        return camera.error if camera else None
+
+    def metrics(self):
+        now = time.monotonic()
+        with self.condition:
+            return [camera.metrics(now) for camera in self.cameras.values()]
+
+    def _read_source(self, camera):
+        """Pull frames from a stream URL/device, keeping only the newest"""
+        import cv2
+
+        source = int(camera.source) if str(camera.source).isdigit() else camera.source
+        cap = cv2.VideoCapture(source)
+        try:
+            while not camera.stopped:
+                ok, frame = cap.read()
+                if not ok:
+                    logger.warning(f"Camera {camera.camera_id} read failed, reconnecting")
+                    cap.release()
+                    time.sleep(1.0)
+                    cap = cv2.VideoCapture(source)
+                    continue
+                if camera.stopped or self.cameras.get(camera.camera_id) is not camera:
+                    break
+                try:
+                    self.submit_frame(camera.camera_id, frame, datetime.now().isoformat())
+                except KeyError:
+                    break
+        finally:
+            cap.release()
+
+    def _pick(self, now):
+        """Choose the cameras to serve this round within the seat budget"""
+        ready = [c for c in self.cameras.values() if c.frame_seq > c.result_seq]
+
+        def priority(camera):
+            staleness = camera.staleness(now)
+            overdue = staleness * camera.min_rate >= 1.0
+            return (overdue, staleness if overdue else camera.weight * staleness)
+
+        ready.sort(key=priority, reverse=True)
+        chosen, seats = [], 0
+        for camera in ready:
+            if chosen and seats + len(camera.seat_positions) > self.round_seats:
+                continue
+            chosen.append(camera)
+            seats += len(camera.seat_positions)
+        return chosen
+
+    def _run(self):
+        while self.running:
+            try:
+                self._run_round()
+            except Exception as e:
+                # One bad camera must not stop the thread every camera shares
+                logger.error(f"Scheduler round failed: {e}")
+                time.sleep(0.5)
+
+    def _run_round(self):
+        with self.condition:
+            if not self.running:
+                return
+            chosen = self._pick(time.monotonic())
+            detector = self.get_detector()
+            if not chosen or detector is None:
+                self.condition.wait(0.5)
+                return
+            batch = [(c, c.frame, c.frame_timestamp, c.frame_received_at, c.frame_seq) for c in chosen]
+
+        try:
+            all_detections = detector.detect_in_frames([(frame, c.seat_positions) for c, frame, _, _, _ in batch])
+            errors = [None] * len(batch)
+        except Exception as e:
+            logger.error(f"Scheduler inference failed for {len(batch)} cameras: {e}")
+            all_detections = [None] * len(batch)
+            errors = [str(e)] * len(batch)
+
+        for (camera, _, timestamp, received_at, seq), detections, error in zip(batch, all_detections, errors):
+            result = None
+            if detections is not None:
+                try:
+                    result = self.on_result(camera, detections, timestamp)
+                except Exception as e:
+                    logger.error(f"Error handling result for camera {camera.camera_id}: {e}")
+                    error = str(e)
+            now = time.monotonic()
+            with self.condition:
+                camera.result_seq = seq
+                if error is None:
+                    camera.result = result
+                    camera.result_frame_seq = seq
+                    camera.error = None
+                    camera.result_at = now
+                    camera.result_times.append(now)
+                    camera.lags_ms.append((now - received_at) * 1000)
+                else:
+                    # Failed frames do not count as served for rate or staleness
+                    camera.error = {'frame_seq': seq, 'message': error}
+                self.condition.notify_all()
@@ -0,0 +1,286 @@
+"""
+Memory-mapped per-session detection time-series store.
+
+Each session gets a directory with one fixed-width column file per field
+(timestamp, seat index, gesture code, confidence, face flag), appended one
+row per seat per frame. Range queries slice the columns with searchsorted
+on the timestamp column instead of scanning documents.
+"""
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+
+from gestures import GESTURE_TYPES, FOCUSED, ABSENT, gesture_code
+
+logger = logging.getLogger(__name__)
+
+TIMESERIES_DIR = os.environ.get(
+    'TIMESERIES_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'timeseries')
+)
+
+COLUMNS = {
+    'timestamp_ms': np.int64,
+    'seat_index': np.uint16,
+    'gesture': np.uint8,
+    'confidence': np.float32,
+    'face': np.uint8
+}
+
+INITIAL_CAPACITY = 1 << 16
+
+# Least recently used stores beyond this are flushed and unmapped; they map
+# their column files again on next use
+MAX_OPEN_STORES = int(os.environ.get('TIMESERIES_MAX_OPEN_STORES', 64))
+
+
+def timestamp_to_ms(timestamp):
+    """Convert an ISO string or datetime to epoch milliseconds"""
+    if isinstance(timestamp, (int, float)):
+        return int(timestamp)
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    return int(timestamp.timestamp() * 1000)
+
+
+class SessionTimeSeries:
+    def __init__(self, directory):
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.mapped = False
+        os.makedirs(directory, exist_ok=True)
+
+        self.seat_ids = []
+        meta_path = os.path.join(directory, 'meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r') as f:
+                self.seat_ids = json.load(f).get('seat_ids', [])
+        self.seat_index = {str(seat_id): i for i, seat_id in enumerate(self.seat_ids)}
+
+        ts_path = self._column_path('timestamp_ms')
+        if os.path.exists(ts_path):
+            self.capacity = os.path.getsize(ts_path) // np.dtype(np.int64).itemsize
+        else:
+            self.capacity = INITIAL_CAPACITY
+        self._map_columns()
+        self.mapped = True
+
+        # Unused capacity is zero-filled and timestamps are always positive
+        self.count = int(np.count_nonzero(self.columns['timestamp_ms']))
+
+    def _column_path(self, name):
+        return os.path.join(self.directory, f'{name}.bin')
+
+    def _map_columns(self):
+        self.columns = {}
+        for name, dtype in COLUMNS.items():
+            path = self._column_path(name)
+            size = self.capacity * np.dtype(dtype).itemsize
+            with open(path, 'ab') as f:
+                if f.tell() < size:
+                    f.truncate(size)
+            self.columns[name] = np.memmap(path, dtype=dtype, mode='r+', shape=(self.capacity,))
+
+    def _grow(self, needed):
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        for column in self.columns.values():
+            column.flush()
+        self.columns = {}
+        self.capacity = capacity
+        self._map_columns()
+
+    def _seat_index_for(self, seat_id):
+        key = str(seat_id)
+        if key not in self.seat_index:
+            self.seat_index[key] = len(self.seat_ids)
+            self.seat_ids.append(seat_id)
+            with open(os.path.join(self.directory, 'meta.json'), 'w') as f:
+                json.dump({'seat_ids': self.seat_ids}, f)
+        return self.seat_index[key]
+
+    def append_frame(self, timestamp, detections, camera_id=None):
+        """
+        Append one row per seat detection for a frame. Carried-forward results
+        are skipped; the store only holds actual observations. With a
+        camera_id, seats are stored as '<camera_id>:<seat_id>' so cameras
+        sharing a session keep separate timelines.
+        """
+        detections = [d for d in detections if not d.get('carried_forward')]
+        n = len(detections)
+        if n == 0:
+            return
+        ts = timestamp_to_ms(timestamp)
+
+        with self.lock:
+            self._ensure_mapped()
+            # Keep the timestamp column sorted for searchsorted range queries
+            if self.count and ts < self.columns['timestamp_ms'][self.count - 1]:
+                ts = int(self.columns['timestamp_ms'][self.count - 1])
+            if self.count + n > self.capacity:
+                self._grow(self.count + n)
+
+            rows = slice(self.count, self.count + n)
+            self.columns['timestamp_ms'][rows] = ts
+            self.columns['seat_index'][rows] = [
+                self._seat_index_for(f"{camera_id}:{d['seat_id']}" if camera_id else d['seat_id']) for d in detections
+            ]
+            self.columns['gesture'][rows] = [gesture_code(d['gesture_type']) for d in detections]
+            self.columns['confidence'][rows] = [d['confidence'] for d in detections]
+            self.columns['face'][rows] = [1 if d['face_detected'] else 0 for d in detections]
+            self.count += n
+
+    def _ensure_mapped(self):
+        if not self.mapped:
+            self._map_columns()
+            self.mapped = True
+
+    def flush(self):
+        with self.lock:
+            for column in self.columns.values():
+                column.flush()
+
+    def release(self):
+        """Flush and unmap the column files; the next use maps them again"""
+        with self.lock:
+            for column in self.columns.values():
+                column.flush()
+            self.columns = {}
+            self.mapped = False
+
+    def _range(self, start=None, end=None):
+        self._ensure_mapped()
+        ts = self.columns['timestamp_ms'][:self.count]
+        lo = 0 if start is None else int(np.searchsorted(ts, timestamp_to_ms(start), side='left'))
+        hi = self.count if end is None else int(np.searchsorted(ts, timestamp_to_ms(end), side='right'))
+        return {name: np.array(column[lo:hi]) for name, column in self.columns.items()}
+
+    def query(self, start=None, end=None, seat_ids=None, timelines=False):
+        """
+        Per-seat aggregates (and optionally timelines) for a time range.
+        Aggregates are computed with a single bincount over seat/gesture pairs.
+        """
+        with self.lock:
+            data = self._range(start, end)
+            seat_table = list(self.seat_ids)
+
+        if seat_ids:
+            wanted = [self.seat_index[str(s)] for s in seat_ids if str(s) in self.seat_index]
+            mask = np.isin(data['seat_index'], wanted)
+            data = {name: column[mask] for name, column in data.items()}
+
+        num_seats = len(seat_table)
+        num_gestures = len(GESTURE_TYPES)
+        counts = np.bincount(
+            data['seat_index'].astype(np.int64) * num_gestures + data['gesture'],
+            minlength=num_seats * num_gestures
+        ).reshape(num_seats, num_gestures)
+        confidence_sums = np.bincount(data['seat_index'], weights=data['confidence'], minlength=num_seats)
+        face_counts = np.bincount(data['seat_index'], weights=data['face'], minlength=num_seats)
+        totals = counts.sum(axis=1)
+
+        seats = []
+        for index, seat_id in enumerate(seat_table):
+            total = int(totals[index])
+            if total == 0:
+                continue
+            present = total - int(counts[index, ABSENT])
+            seat = {
+                'seat_id': seat_id,
+                'samples': total,
+                'gesture_counts': {GESTURE_TYPES[g]: int(c) for g, c in enumerate(counts[index]) if c},
+                'dominant_gesture': GESTURE_TYPES[int(np.argmax(counts[index]))],
+                'focus_percentage': float(counts[index, FOCUSED] / total * 100),
+                'presence_percentage': float(face_counts[index] / total * 100),
+                'mean_confidence': float(confidence_sums[index] / present) if present else 0.0
+            }
+            if timelines:
+                rows = data['seat_index'] == index
+                seat['timeline'] = {
+                    'timestamp_ms': data['timestamp_ms'][rows].tolist(),
+                    'gesture': data['gesture'][rows].tolist(),
+                    'confidence': np.round(data['confidence'][rows].astype(np.float64), 3).tolist(),
+                    'face': data['face'][rows].tolist()
+                }
+            seats.append(seat)
+
+        return {
+            'rows': int(len(data['timestamp_ms'])),
+            'start_ms': int(data['timestamp_ms'][0]) if len(data['timestamp_ms']) else None,
+            'end_ms': int(data['timestamp_ms'][-1]) if len(data['timestamp_ms']) else None,
+            'gesture_table': GESTURE_TYPES,
+            'seats': seats
+        }
+
+    def iter_rows(self, start=None, end=None, chunk_size=65536):
+        """Yield (timestamp_ms, seat_id, gesture, confidence, face) rows in chunks"""
+        with self.lock:
+            data = self._range(start, end)
+            seat_table = list(self.seat_ids)
+        for offset in range(0, len(data['timestamp_ms']), chunk_size):
+            chunk = slice(offset, offset + chunk_size)
+            for ts, seat, gesture, conf, face in zip(data['timestamp_ms'][chunk], data['seat_index'][chunk],
+                                                      data['gesture'][chunk], data['confidence'][chunk],
+                                                      data['face'][chunk]):
+                yield int(ts), seat_table[seat], GESTURE_TYPES[gesture], float(conf), bool(face)
+
+
+_stores = {}
+_mapped = OrderedDict()
+_stores_lock = threading.Lock()
+
+
+def _session_directory(session_id):
+    safe_id = re.sub(r'[^A-Za-z0-9_-]', '_', str(session_id))
+    return os.path.join(TIMESERIES_DIR, safe_id)
+
+
+def get_store(session_id, create=True):
+    """
+    Return the store for a session, opening or creating it on first use.
+    There is one store object per session, so callers holding a store that
+    gets unmapped by LRU eviction keep working on the same object.
+    """
+    evicted = []
+    with _stores_lock:
+        store = _stores.get(session_id)
+        if store is None:
+            directory = _session_directory(session_id)
+            if not create and not os.path.isdir(directory):
+                return None
+            store = SessionTimeSeries(directory)
+            _stores[session_id] = store
+        _mapped[session_id] = store
+        _mapped.move_to_end(session_id)
+        while len(_mapped) > MAX_OPEN_STORES:
+            evicted.append(_mapped.popitem(last=False))
+    for evicted_id, evicted_store in evicted:
+        logger.debug(f"Unmapping idle time-series store for session {evicted_id}")
+        evicted_store.release()
+    return store
+
+
+def close_store(session_id):
+    """Flush and release a session's store; returns whether one was open"""
+    with _stores_lock:
+        store = _stores.pop(session_id, None)
+        _mapped.pop(session_id, None)
+    if store is not None:
+        store.release()
+    return store is not None
+
+
+def close_all():
+    with _stores_lock:
+        stores = list(_stores.values())
+        _stores.clear()
+        _mapped.clear()
+    for store in stores:
+        store.release()
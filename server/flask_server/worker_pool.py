@@ -0,0 +1,281 @@
+"""
+Process-pool inference workers with shared-memory frame handoff.
+
+Each worker is a separate process holding its own loaded YOLODetector, so
+seat cropping, result parsing and gesture classification run outside the
+Flask process's GIL. Decoded frames are copied once into a per-worker
+shared memory block; only the block name, shape and seat layout cross the
+pipe. A monitor thread health-checks idle workers one at a time and restarts
+those that die; a request that times out hands its worker to a background
+restart so the request thread never waits for a model to reload.
+"""
+import logging
+import multiprocessing as mp
+import os
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import frame_decode
+import seat_cadence
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SLOT_BYTES = 1920 * 1080 * 3
+HEALTH_CHECK_INTERVAL = 5.0
+
+
+def _worker_main(worker_id, model_path, detector_kwargs, runtime_config, conn):
+    """Worker process loop: attach to the frame block, run detection, reply"""
+    from detector import YOLODetector
+
+    detector = YOLODetector(model_path=model_path, **detector_kwargs)
+    detector.apply_runtime_config({**detector.runtime_config, **runtime_config})
+    conn.send(('ready', detector.model_type))
+
+    blocks = {}
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        kind = message[0]
+        if kind == 'stop':
+            break
+        if kind == 'ping':
+            conn.send(('pong', None))
+            continue
+
+        _, task_id, block_name, shape, seat_positions = message
+        try:
+            block = blocks.get(block_name)
+            if block is None:
+                # The parent replaces the block when a larger frame arrives
+                for old in blocks.values():
+                    old.close()
+                blocks = {block_name: shared_memory.SharedMemory(name=block_name)}
+                block = blocks[block_name]
+            frame = np.ndarray(shape, dtype=np.uint8, buffer=block.buf)
+            conn.send(('result', (task_id, detector.detect_in_seats(frame, seat_positions))))
+        except Exception as e:
+            conn.send(('error', (task_id, str(e))))
+
+    for block in blocks.values():
+        block.close()
+
+
+class _Worker:
+    def __init__(self, worker_id):
+        self.worker_id = worker_id
+        self.process = None
+        self.conn = None
+        self.block = None
+        self.tasks_done = 0
+        self.restarts = 0
+        self.model_type = None
+
+    def ensure_block(self, nbytes):
+        if self.block is None or self.block.size < nbytes:
+            if self.block is not None:
+                self.block.close()
+                self.block.unlink()
+            self.block = shared_memory.SharedMemory(create=True, size=max(nbytes, DEFAULT_SLOT_BYTES))
+        return self.block
+
+
+class InferenceWorkerPool:
+    def __init__(self, model_path, num_workers=None, detector_kwargs=None, timeout=10.0):
+        self.model_path = model_path
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.detector_kwargs = detector_kwargs or {}
+        self.timeout = timeout
+        self.context = mp.get_context('spawn')
+
+        # Split the host's cores between workers to avoid oversubscription
+        self.runtime_config = {
+            'torch_threads': max(1, (os.cpu_count() or 1) // self.num_workers),
+            'cv2_threads': 1
+        }
+
+        self.workers = [_Worker(i) for i in range(self.num_workers)]
+        self.idle = list(self.workers)
+        self.condition = threading.Condition()
+        self.task_counter = 0
+        self.closed = False
+
+        try:
+            for worker in self.workers:
+                self._start(worker)
+        except Exception:
+            # Don't leak the workers and shared memory blocks already started
+            self.shutdown()
+            raise
+
+        self.monitor = threading.Thread(target=self._monitor, daemon=True)
+        self.monitor.start()
+        logger.info(f"Started {self.num_workers} inference workers for {self.model_path}")
+
+    def _start(self, worker):
+        parent_conn, child_conn = self.context.Pipe()
+        worker.process = self.context.Process(
+            target=_worker_main,
+            args=(worker.worker_id, self.model_path, self.detector_kwargs, self.runtime_config, child_conn),
+            daemon=True
+        )
+        worker.process.start()
+        child_conn.close()
+        worker.conn = parent_conn
+
+        # Model loading can be slow; wait for the worker to report in
+        try:
+            if not parent_conn.poll(120):
+                raise RuntimeError(f"Inference worker {worker.worker_id} did not start")
+            _, worker.model_type = parent_conn.recv()
+        except EOFError:
+            raise RuntimeError(f"Inference worker {worker.worker_id} exited during startup")
+
+    def _restart(self, worker):
+        logger.warning(f"Restarting inference worker {worker.worker_id}")
+        if worker.process is not None and worker.process.is_alive():
+            worker.process.kill()
+            worker.process.join(5)
+        if worker.conn is not None:
+            worker.conn.close()
+        if self.closed:
+            return
+        worker.restarts += 1
+        self._start(worker)
+
+    def _restart_in_background(self, worker):
+        """Restart a worker off the calling thread; it rejoins the idle list when done"""
+        def restart():
+            try:
+                self._restart(worker)
+            except Exception as e:
+                logger.error(f"Could not restart worker {worker.worker_id}: {e}")
+            finally:
+                # A worker that failed to restart is retried by the monitor
+                self._release(worker)
+
+        threading.Thread(target=restart, daemon=True).start()
+
+    def _monitor(self):
+        while not self.closed:
+            time.sleep(HEALTH_CHECK_INTERVAL)
+            # Take one idle worker at a time so requests can still acquire the
+            # others; busy ones are covered by the request timeout
+            for worker in self.workers:
+                with self.condition:
+                    if self.closed or worker not in self.idle:
+                        continue
+                    self.idle.remove(worker)
+                try:
+                    if not worker.process.is_alive():
+                        self._restart(worker)
+                    else:
+                        worker.conn.send(('ping',))
+                        if not worker.conn.poll(self.timeout) or worker.conn.recv()[0] != 'pong':
+                            self._restart(worker)
+                except Exception as e:
+                    logger.error(f"Health check failed for worker {worker.worker_id}: {e}")
+                    try:
+                        self._restart(worker)
+                    except Exception as restart_error:
+                        logger.error(f"Could not restart worker {worker.worker_id}: {restart_error}")
+                finally:
+                    self._release(worker)
+
+    def _acquire(self):
+        with self.condition:
+            while not self.idle:
+                if self.closed:
+                    raise RuntimeError("Inference worker pool is closed")
+                self.condition.wait()
+            return self.idle.pop()
+
+    def _release(self, worker):
+        with self.condition:
+            self.idle.append(worker)
+            self.condition.notify()
+
+    def detect_in_seats(self, frame, seat_positions, session_id=None, cadence_config=None, decode_scale=1):
+        """Run detection on a worker; same contract as YOLODetector.detect_in_seats"""
+        def infer(seats):
+            return frame_decode.restore_bboxes(self._detect(frame, seats), decode_scale)
+
+        if session_id is not None:
+            # Cadence state lives in this process so every worker sees the same schedule
+            return seat_cadence.run_with_cadence(
+                seat_cadence.get_session(session_id, cadence_config),
+                seat_positions,
+                infer
+            )
+        return infer(seat_positions)
+
+    def _detect(self, frame, seat_positions):
+        frame = np.ascontiguousarray(frame, dtype=np.uint8)
+        worker = self._acquire()
+        healthy = True
+        try:
+            block = worker.ensure_block(frame.nbytes)
+            np.ndarray(frame.shape, dtype=np.uint8, buffer=block.buf)[...] = frame
+
+            with self.condition:
+                self.task_counter += 1
+                task_id = self.task_counter
+            worker.conn.send(('detect', task_id, block.name, frame.shape, seat_positions))
+
+            if not worker.conn.poll(self.timeout):
+                healthy = False
+                raise TimeoutError(f"Inference worker {worker.worker_id} timed out")
+            kind, (result_task_id, result) = worker.conn.recv()
+            if kind == 'error':
+                raise RuntimeError(f"Inference worker {worker.worker_id} failed: {result}")
+            worker.tasks_done += 1
+            return result
+        except (EOFError, BrokenPipeError, ConnectionResetError):
+            healthy = False
+            raise RuntimeError(f"Inference worker {worker.worker_id} crashed")
+        finally:
+            if healthy:
+                self._release(worker)
+            else:
+                self._restart_in_background(worker)
+
+    def status(self):
+        return {
+            'num_workers': self.num_workers,
+            'idle_workers': len(self.idle),
+            'runtime_config': self.runtime_config,
+            'workers': [
+                {
+                    'worker_id': w.worker_id,
+                    'pid': w.process.pid if w.process else None,
+                    'alive': bool(w.process and w.process.is_alive()),
+                    'model_type': w.model_type,
+                    'tasks_done': w.tasks_done,
+                    'restarts': w.restarts
+                }
+                for w in self.workers
+            ]
+        }
+
+    def shutdown(self):
+        self.closed = True
+        with self.condition:
+            self.condition.notify_all()
+        for worker in self.workers:
+            if worker.process is not None:
+                try:
+                    worker.conn.send(('stop',))
+                except Exception:
+                    pass
+                worker.process.join(5)
+                if worker.process.is_alive():
+                    worker.process.kill()
+            if worker.block is not None:
+                worker.block.close()
+                worker.block.unlink()
+        logger.info("Inference worker pool stopped")
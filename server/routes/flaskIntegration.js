@@ -61,12 +61,14 @@ router.post('/initialize-model', auth, async (req, res) => {
 // Process frame with YOLO detection
 router.post('/detect-frame', auth, async (req, res) => {
   try {
-    const { frameData, seatPositions, sessionId } = req.body;
+    const { frameData, seatPositions, sessionId, presenceConfig, analyticsWindow } = req.body;
     
     const response = await axios.post(`${FLASK_SERVER_URL}/api/detect-frame`, {
       frame_data: frameData,
       seat_positions: seatPositions,
-      session_id: sessionId
+      session_id: sessionId,
+      presence_config: presenceConfig,
+      analytics_window: analyticsWindow
     }, { timeout: 10000 }); // 10 second timeout for detection
     
     // Process detection results
@@ -86,7 +88,11 @@ router.post('/detect-frame', auth, async (req, res) => {
           face_detected: detection.face_detected,
           gesture_type: detection.gesture_type,
           confidence: detection.confidence,
-          is_occupied: detection.face_detected || detection.body_detected
+          is_occupied: detection.face_detected || detection.body_detected,
+          // Attendance fields are confirmed by the Flask presence tracker
+          presence_state: 'presence_state' in detection ? detection.presence_state : seat.presence_state,
+          attendance_time: 'attendance_time' in detection ? detection.attendance_time : seat.attendance_time,
+          departure_time: 'departure_time' in detection ? detection.departure_time : seat.departure_time
         };
       }
       
@@ -103,7 +109,9 @@ router.post('/detect-frame', auth, async (req, res) => {
       success: true,
       updated_seats: updatedSeats,
       detection_summary: detectionResults.summary,
-      gesture_analysis: detectionResults.gesture_analysis
+      gesture_analysis: detectionResults.gesture_analysis,
+      analytics: detectionResults.analytics || null,
+      presence_events: detectionResults.presence_events || []
     });
     
   } catch (error) {
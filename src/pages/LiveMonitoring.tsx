@@ -44,6 +44,7 @@ interface SeatPosition {
   total_focus_duration: number;
   attendance_time: string | null;
   departure_time: string | null;
+  presence_state?: 'present' | 'absent';
 }
 
 interface DetectionData {
@@ -907,25 +908,27 @@ export default function LiveMonitoring() {
             newSeat.focus_start_time = null;
           }
 
-          // Ensure attendance tracking
-          if (seat.face_detected && !existingSeat.attendance_time) {
-            newSeat.attendance_time = new Date().toISOString();
-          } else if (existingSeat.attendance_time) {
-            newSeat.attendance_time = existingSeat.attendance_time;
-          }
-
-          // Track departure time if student was present but is now gone
-          if (!seat.face_detected && existingSeat.face_detected && existingSeat.attendance_time && !existingSeat.departure_time) {
-            newSeat.departure_time = new Date().toISOString();
-          } else if (existingSeat.departure_time) {
-            newSeat.departure_time = existingSeat.departure_time;
-          }
+          // Attendance and departure come from the server's presence tracker,
+          // which only changes them after a state has held for several frames
+          newSeat.attendance_time = seat.attendance_time ?? existingSeat.attendance_time ?? null;
+          newSeat.departure_time = seat.departure_time !== undefined ? seat.departure_time : existingSeat.departure_time;
 
           return newSeat;
         });
 
         setSeatPositions(newSeats);
 
+        // Notify only on confirmed arrivals/departures, one toast per kind per frame
+        const presenceEvents = response.data.presence_events || [];
+        const arrivedSeats = presenceEvents.filter((event: any) => event.event === 'arrived').map((event: any) => event.seat_id);
+        const departedSeats = presenceEvents.filter((event: any) => event.event === 'departed').map((event: any) => event.seat_id);
+        if (arrivedSeats.length > 0) {
+          toast.success(`Arrived: seat ${arrivedSeats.join(', ')}`, { duration: 3000 });
+        }
+        if (departedSeats.length > 0) {
+          toast(`Left: seat ${departedSeats.join(', ')}`, { duration: 3000 });
+        }
+
         // Calculate detection statistics
         const totalDetections = newSeats.filter((seat: any) => seat.face_detected).length;
         const focusedCount = newSeats.filter((seat: any) => seat.gesture_type === 'focused').length;